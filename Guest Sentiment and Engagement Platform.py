@@ -4,25 +4,289 @@
 # In[ ]:
 
 
-from transformers import pipeline
+import os
+import re
+import sys
+import asyncio
+import time
+import json
+import sqlite3
+import hashlib
+import itertools
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
+import numpy as np
 import logging
 
 # Setup Logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 
+def build_sentiment_pipeline(model_name, backend="pytorch", cache_dir="model_cache"):
+    """
+    Build a CPU sentiment pipeline for one of three backends:
+    - "pytorch": the full-precision model
+    - "quantized": dynamic int8 quantization of the Linear layers
+    - "onnx": an ONNX Runtime export, written to cache_dir once and reloaded from there
+    transformers, torch and optimum are imported here so that importing this module stays cheap.
+    """
+    from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassification
+
+    if backend == "pytorch":
+        return pipeline("sentiment-analysis", model=model_name)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name, cache_dir=cache_dir)
+    if backend == "quantized":
+        try:
+            import torch
+        except ImportError:
+            raise ImportError("The quantized backend requires PyTorch.")
+        model = AutoModelForSequenceClassification.from_pretrained(model_name, cache_dir=cache_dir)
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    elif backend == "onnx":
+        try:
+            from optimum.onnxruntime import ORTModelForSequenceClassification
+        except ImportError:
+            raise ImportError("The onnx backend requires optimum[onnxruntime].")
+        onnx_dir = os.path.join(cache_dir, model_name.replace("/", "--") + "-onnx")
+        if os.path.isdir(onnx_dir):
+            model = ORTModelForSequenceClassification.from_pretrained(onnx_dir)
+        else:
+            model = ORTModelForSequenceClassification.from_pretrained(model_name, export=True, cache_dir=cache_dir)
+            model.save_pretrained(onnx_dir)
+            tokenizer.save_pretrained(onnx_dir)
+    else:
+        raise ValueError(f"Unknown backend '{backend}', expected 'pytorch', 'quantized' or 'onnx'.")
+    return pipeline("sentiment-analysis", model=model, tokenizer=tokenizer)
+
+
+def resolve_model_revision(model_name, cache_dirs=(None, "model_cache")):
+    """
+    Identify the model version without loading its weights: a hash of config.json for a local model
+    directory, the snapshot commit of a locally cached config.json, or the commit hash reported when
+    fetching only the config as a last resort.
+    """
+    if os.path.isdir(model_name):
+        with open(os.path.join(model_name, "config.json"), "rb") as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    try:
+        from huggingface_hub import try_to_load_from_cache
+    except ImportError:
+        try_to_load_from_cache = None
+    if try_to_load_from_cache is not None:
+        for cache_dir in cache_dirs:
+            path = try_to_load_from_cache(model_name, "config.json", cache_dir=cache_dir)
+            if isinstance(path, str):
+                # Cached files live under .../snapshots/<commit>/config.json
+                return os.path.basename(os.path.dirname(path))
+    from transformers import AutoConfig
+    config = AutoConfig.from_pretrained(model_name)
+    return getattr(config, "_commit_hash", None) or getattr(config, "transformers_version", "")
+
+
+# Process-wide registry of loaded pipelines, shared by every SentimentAnalysis instance
+_pipelines = {}
+_pipelines_lock = threading.Lock()
+
+
+def get_sentiment_pipeline(model_name, backend="pytorch"):
+    """Return the shared pipeline for (model_name, backend), loading it on first use."""
+    key = (model_name, backend)
+    if key not in _pipelines:
+        with _pipelines_lock:
+            if key not in _pipelines:
+                try:
+                    _pipelines[key] = build_sentiment_pipeline(model_name, backend)
+                    logging.info(f"Model '{model_name}' loaded successfully ({backend} backend).")
+                except Exception as e:
+                    logging.error(f"Error loading model '{model_name}': {e}")
+                    raise
+    return _pipelines[key]
+
+
+class SentimentCache:
+    """
+    Persistent sentiment result cache: SQLite on disk with an in-memory LRU in front.
+    Keys are hashes of normalized text; the whole store is cleared when model_id changes.
+    """
+
+    def __init__(self, path="sentiment_cache.sqlite", model_id="", max_memory_entries=100000):
+        self.max_memory_entries = max_memory_entries
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, result TEXT)")
+            row = self.connection.execute("SELECT value FROM meta WHERE key = 'model_id'").fetchone()
+            if row is None or row[0] != model_id:
+                if row is not None:
+                    logging.info(f"Model changed ({row[0]} -> {model_id}), clearing sentiment cache")
+                self.connection.execute("DELETE FROM results")
+                self.connection.execute("INSERT OR REPLACE INTO meta VALUES ('model_id', ?)", (model_id,))
+
+    @staticmethod
+    def key(text):
+        """Hash of the text after lowercasing and collapsing whitespace."""
+        normalized = re.sub(r"\s+", " ", text.strip().lower())
+        return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+    def _remember(self, key, result):
+        self.memory[key] = result
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.max_memory_entries:
+            self.memory.popitem(last=False)
+
+    def get_many(self, keys):
+        """
+        Return {key: result} for the keys found in memory or on disk.
+        keys may repeat (one per feedback); each repeat counts as a hit or miss, but is looked up once.
+        """
+        found = {}
+        with self.lock:
+            missing = []
+            for key in dict.fromkeys(keys):
+                if key in self.memory:
+                    self.memory.move_to_end(key)
+                    found[key] = self.memory[key]
+                else:
+                    missing.append(key)
+            # SQLite limits the number of bound parameters per statement
+            for start in range(0, len(missing), 900):
+                chunk = missing[start:start + 900]
+                rows = self.connection.execute(
+                    f"SELECT key, result FROM results WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+                for key, result in rows:
+                    found[key] = json.loads(result)
+                    self._remember(key, found[key])
+            hits = sum(key in found for key in keys)
+            self.hits += hits
+            self.misses += len(keys) - hits
+        return found
+
+    def put_many(self, items):
+        """Store {key: result} in memory and on disk."""
+        with self.lock:
+            for key, result in items.items():
+                self._remember(key, result)
+            with self.connection:
+                self.connection.executemany("INSERT OR REPLACE INTO results VALUES (?, ?)",
+                                            [(key, json.dumps(result)) for key, result in items.items()])
+
+    def stats(self):
+        """Hit/miss counters since the cache was opened."""
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / lookups if lookups else 0.0}
+
+
+class RollingSentimentSummary:
+    """
+    Fixed-size ring buffer of time buckets holding per-label counts and score sums.
+    Memory does not grow with the number of results and a windowed summary costs O(buckets).
+    """
+
+    def __init__(self, labels=("POSITIVE", "NEGATIVE"), bucket_seconds=3600, num_buckets=24 * 30):
+        self.labels = list(labels)
+        self.label_index = {label: i for i, label in enumerate(self.labels)}
+        self.bucket_seconds = bucket_seconds
+        self.num_buckets = num_buckets
+        self.bucket_ids = np.full(num_buckets, -1, dtype=np.int64)
+        self.counts = np.zeros((num_buckets, len(self.labels)), dtype=np.int64)
+        self.score_sums = np.zeros((num_buckets, len(self.labels)), dtype=np.float64)
+
+    def update(self, labels, scores, timestamps=None):
+        """Add results; timestamps are epoch seconds and default to now."""
+        label_codes = np.array([self.label_index[label] for label in labels], dtype=np.intp)
+        scores = np.asarray(scores, dtype=np.float64)
+        if timestamps is None:
+            timestamps = np.full(len(label_codes), time.time())
+        bucket_ids = (np.asarray(timestamps, dtype=np.float64) // self.bucket_seconds).astype(np.int64)
+
+        # Results older than the buffer horizon cannot be represented and are dropped
+        newest = max(bucket_ids.max(initial=-1), self.bucket_ids.max())
+        keep = bucket_ids > newest - self.num_buckets
+        label_codes, scores, bucket_ids = label_codes[keep], scores[keep], bucket_ids[keep]
+
+        # Reset slots that are being reused for a newer bucket
+        slots = bucket_ids % self.num_buckets
+        unique_slots, first = np.unique(slots, return_index=True)
+        stale = self.bucket_ids[unique_slots] < bucket_ids[first]
+        self.counts[unique_slots[stale]] = 0
+        self.score_sums[unique_slots[stale]] = 0
+        self.bucket_ids[unique_slots] = np.maximum(self.bucket_ids[unique_slots], bucket_ids[first])
+
+        # Late results for a slot that already holds a newer bucket are dropped
+        current = self.bucket_ids[slots] == bucket_ids
+        np.add.at(self.counts, (slots[current], label_codes[current]), 1)
+        np.add.at(self.score_sums, (slots[current], label_codes[current]), scores[current])
+
+    def summary(self, window_seconds, now=None):
+        """Label share (%), count and mean score over the last window_seconds."""
+        now = time.time() if now is None else now
+        current_bucket = int(now // self.bucket_seconds)
+        first_bucket = current_bucket - int(np.ceil(window_seconds / self.bucket_seconds)) + 1
+        in_window = (self.bucket_ids >= first_bucket) & (self.bucket_ids <= current_bucket)
+
+        counts = self.counts[in_window].sum(axis=0)
+        score_sums = self.score_sums[in_window].sum(axis=0)
+        total = counts.sum()
+        return pd.DataFrame({
+            'count': counts,
+            'percentage': counts / total * 100 if total else np.zeros(len(counts)),
+            'mean_score': np.divide(score_sums, counts, out=np.zeros(len(counts)), where=counts > 0)
+        }, index=pd.Index(self.labels, name='label'))
+
+
 class SentimentAnalysis:
     """Class for sentiment analysis using a transformer-based model."""
 
-    def __init__(self, model_name="distilbert-base-uncased-finetuned-sst-2-english"):
-        """Initialize the sentiment analysis pipeline."""
-        try:
-            self.model = pipeline("sentiment-analysis", model=model_name)
-            logging.info(f"Model '{model_name}' loaded successfully.")
-        except Exception as e:
-            logging.error(f"Error loading model '{model_name}': {e}")
-            raise
+    def __init__(self, model_name="distilbert-base-uncased-finetuned-sst-2-english", batch_size=32,
+                 max_length=512, num_threads=None, window_size=4096, backend="pytorch", preload=False,
+                 cache_path=None, rolling_summary=None):
+        """
+        Initialize the sentiment analysis pipeline.
+        Inputs are processed in windows of window_size reviews, sorted by length inside each window
+        and run in micro-batches of batch_size, truncated to max_length tokens.
+        num_threads caps the CPU threads used by PyTorch.
+        backend selects "pytorch", "quantized" (dynamic int8) or "onnx" (ONNX Runtime) inference.
+        The model is loaded lazily and shared across instances; preload=True loads it immediately.
+        cache_path enables a persistent SentimentCache for analyze_feedback results.
+        rolling_summary is a RollingSentimentSummary that generate_report keeps up to date.
+        """
+        self.model_name = model_name
+        self.backend = backend
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.window_size = window_size
+        self.cache_path = cache_path
+        self._cache = None
+        self.rolling_summary = rolling_summary
+        if num_threads is not None:
+            import torch
+            torch.set_num_threads(num_threads)
+        if preload:
+            get_sentiment_pipeline(model_name, backend)
+
+    @property
+    def model(self):
+        """The shared pipeline, loaded on first use."""
+        return get_sentiment_pipeline(self.model_name, self.backend)
+
+    @property
+    def cache(self):
+        """
+        The result cache, opened on first use for the model's name, revision and settings.
+        The revision is resolved without loading the model, so fully cached calls never load it.
+        """
+        if self._cache is None and self.cache_path is not None:
+            revision = resolve_model_revision(self.model_name)
+            model_id = f"{self.model_name}|{self.backend}|{revision}|max_length={self.max_length}"
+            self._cache = SentimentCache(self.cache_path, model_id)
+        return self._cache
 
     @staticmethod
     def validate_feedback(feedbacks):
@@ -33,20 +297,220 @@ class SentimentAnalysis:
             raise ValueError("All feedbacks must be non-empty strings.")
         return feedbacks
 
+    @staticmethod
+    def _check_feedback(feedback):
+        if not isinstance(feedback, str) or not feedback.strip():
+            raise ValueError("All feedbacks must be non-empty strings.")
+        return feedback
+
+    def stream_feedback(self, feedbacks):
+        """
+        Yield sentiment results in the original order, one dict per feedback.
+        Accepts any iterable; only one window of reviews is held in memory at a time.
+        Sorting by length inside a window keeps padding per micro-batch small.
+        """
+        iterator = iter(feedbacks)
+        processed = 0
+        start = time.perf_counter()
+        while True:
+            window = [self._check_feedback(f) for f in itertools.islice(iterator, self.window_size)]
+            if not window:
+                break
+
+            order = sorted(range(len(window)), key=lambda i: len(window[i]))
+            results = [None] * len(window)
+            for batch_start in range(0, len(order), self.batch_size):
+                batch_idx = order[batch_start:batch_start + self.batch_size]
+                batch_results = self.model([window[i] for i in batch_idx], batch_size=self.batch_size,
+                                           truncation=True, max_length=self.max_length)
+                for i, result in zip(batch_idx, batch_results):
+                    results[i] = result
+
+            processed += len(window)
+            yield from results
+
+        elapsed = time.perf_counter() - start
+        if processed:
+            logging.info(f"Analyzed {processed} feedbacks in {elapsed:.2f}s ({processed / elapsed:.1f} reviews/s)")
+
     def analyze_feedback(self, feedbacks):
         """Analyze guest feedback for sentiment."""
-        feedbacks = self.validate_feedback(feedbacks)
+        if not isinstance(feedbacks, list):
+            raise ValueError("Feedbacks must be a list of strings.")
         logging.info("Analyzing feedback for sentiment")
-        results = self.model(feedbacks)
-        return pd.DataFrame(results)
+        if self.cache is None:
+            return pd.DataFrame(list(self.stream_feedback(feedbacks)))
+
+        keys = [self.cache.key(self._check_feedback(f)) for f in feedbacks]
+        results = self.cache.get_many(keys)
 
-    def generate_report(self, feedbacks):
+        # Run the model once per distinct uncached text
+        pending = {}
+        for key, feedback in zip(keys, feedbacks):
+            if key not in results:
+                pending.setdefault(key, feedback)
+        if pending:
+            computed = dict(zip(pending, self.stream_feedback(pending.values())))
+            self.cache.put_many(computed)
+            results.update(computed)
+
+        logging.info(f"Sentiment cache: {self.cache.stats()}")
+        return pd.DataFrame([results[key] for key in keys])
+
+    def benchmark_throughput(self, feedbacks, repeats=3):
+        """Return the best observed CPU throughput in reviews per second over the given feedbacks."""
+        best = 0.0
+        for _ in range(repeats):
+            start = time.perf_counter()
+            count = sum(1 for _ in self.stream_feedback(feedbacks))
+            best = max(best, count / (time.perf_counter() - start))
+        logging.info(f"Throughput: {best:.1f} reviews/s (batch_size={self.batch_size}, max_length={self.max_length})")
+        return best
+
+    def generate_report(self, feedbacks, timestamps=None):
         """Generate a sentiment analysis report."""
         sentiment_df = self.analyze_feedback(feedbacks)
         summary = sentiment_df['label'].value_counts(normalize=True) * 100
         logging.info(f"Sentiment Summary:\n{summary}")
+        if self.rolling_summary is not None:
+            self.rolling_summary.update(sentiment_df['label'], sentiment_df['score'], timestamps)
         return sentiment_df, summary
 
+    def windowed_summary(self, windows=(("24h", 86400), ("7d", 7 * 86400), ("30d", 30 * 86400)), now=None):
+        """Label mix for each (name, seconds) window from the rolling summary."""
+        if self.rolling_summary is None:
+            raise ValueError("No rolling summary configured; pass rolling_summary to SentimentAnalysis.")
+        return {name: self.rolling_summary.summary(seconds, now) for name, seconds in windows}
+
+
+class SentimentBatcher:
+    """
+    Asyncio serving layer that groups concurrent single-feedback requests into micro-batches.
+    A batch is dispatched when it reaches max_batch_size or max_wait_ms after its first request,
+    and inference runs on a worker thread so the event loop stays responsive.
+    """
+
+    def __init__(self, analyzer, max_batch_size=32, max_wait_ms=10):
+        self.analyzer = analyzer
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.queue = None
+        self.worker = None
+
+    async def start(self):
+        self.queue = asyncio.Queue()
+        self.worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self.worker.cancel()
+        try:
+            await self.worker
+        except asyncio.CancelledError:
+            pass
+        self.executor.shutdown(wait=True)
+
+    async def analyze(self, feedback):
+        """Return the sentiment result for one feedback once its micro-batch has run."""
+        self.analyzer._check_feedback(feedback)
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((feedback, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            texts = [feedback for feedback, _ in batch]
+            try:
+                results = await loop.run_in_executor(self.executor, self.analyzer.analyze_feedback, texts)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results.to_dict('records')):
+                if not future.done():
+                    future.set_result(result)
+
+
+async def load_test(analyzer, feedbacks, num_requests=1000, concurrency=64, max_batch_size=32, max_wait_ms=10):
+    """
+    Fire num_requests single-feedback requests with the given concurrency through a SentimentBatcher
+    and report throughput and p50/p95/p99 latency.
+    """
+    batcher = SentimentBatcher(analyzer, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+    await batcher.start()
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one_request(i):
+        async with semaphore:
+            start = time.perf_counter()
+            await batcher.analyze(feedbacks[i % len(feedbacks)])
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_request(i) for i in range(num_requests)))
+    elapsed = time.perf_counter() - start
+    await batcher.stop()
+
+    latencies_ms = np.array(latencies) * 1000
+    report = {
+        'requests': num_requests,
+        'concurrency': concurrency,
+        'requests_per_second': num_requests / elapsed,
+        'p50_ms': float(np.percentile(latencies_ms, 50)),
+        'p95_ms': float(np.percentile(latencies_ms, 95)),
+        'p99_ms': float(np.percentile(latencies_ms, 99))
+    }
+    logging.info(f"Load test: {report}")
+    return report
+
+
+def benchmark_backends(feedbacks, backends=("pytorch", "quantized", "onnx"), **kwargs):
+    """
+    Compare backends on the same feedbacks: single-review median latency, batched throughput,
+    and label agreement with the full-precision "pytorch" labels (accuracy parity).
+    """
+    reference_labels = None
+    rows = []
+    for backend in backends:
+        try:
+            analyzer = SentimentAnalysis(backend=backend, preload=True, **kwargs)
+        except ImportError as e:
+            logging.warning(f"Skipping {backend} backend: {e}")
+            continue
+
+        latencies = []
+        for feedback in feedbacks[:50]:
+            start = time.perf_counter()
+            analyzer.model(feedback, truncation=True)
+            latencies.append(time.perf_counter() - start)
+
+        throughput = analyzer.benchmark_throughput(feedbacks, repeats=1)
+        labels = [result['label'] for result in analyzer.stream_feedback(feedbacks)]
+        if backend == "pytorch":
+            reference_labels = labels
+        agreement = (np.mean([a == b for a, b in zip(labels, reference_labels)])
+                     if reference_labels is not None else np.nan)
+
+        rows.append({'backend': backend, 'median_latency_ms': np.median(latencies) * 1000,
+                     'reviews_per_second': throughput, 'label_agreement': agreement})
+    results = pd.DataFrame(rows)
+    logging.info(f"Backend benchmark:\n{results}")
+    return results
+
 
 # Main Execution
 feedbacks = [
@@ -57,9 +521,12 @@ feedbacks = [
 ]
 
 analyzer = SentimentAnalysis()
-df, summary = analyzer.generate_report(feedbacks)
-print("Sentiment Analysis Results:")
-print(df)
-print("\nSentiment Summary (%):")
-print(summary)
+if "--load-test" in sys.argv:
+    asyncio.run(load_test(analyzer, feedbacks))
+else:
+    df, summary = analyzer.generate_report(feedbacks)
+    print("Sentiment Analysis Results:")
+    print(df)
+    print("\nSentiment Summary (%):")
+    print(summary)
 
@@ -4,27 +4,218 @@
 # In[ ]:
 
 
+import os
+import glob
+import re
+import json
+import time
+import hashlib
+from contextlib import contextmanager
+from functools import lru_cache
+from datetime import datetime
 import pandas as pd
 import numpy as np
 import logging
-from sklearn.ensemble import GradientBoostingRegressor
+from sklearn.ensemble import GradientBoostingRegressor, HistGradientBoostingRegressor
 from sklearn.model_selection import train_test_split, GridSearchCV, cross_val_score
 from sklearn.metrics import mean_squared_error
 import joblib
 import dash
-from dash import dcc, html
+from dash import dcc, html, Input, Output
 import plotly.express as px
 
+# Production WSGI server for the dashboard, if installed
+try:
+    from waitress import serve
+except ImportError:
+    serve = None
+
 # Setup Logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 
+@contextmanager
+def log_duration(step):
+    """Log the wall-clock time of a pipeline step."""
+    start = time.perf_counter()
+    yield
+    logging.info(f"{step} took {time.perf_counter() - start:.3f}s")
+
+
+class FeatureStore:
+    """Parquet cache of engineered features, keyed by the source file's mtime and size."""
+
+    def __init__(self, cache_dir='feature_cache'):
+        self.cache_dir = cache_dir
+
+    def _cache_path(self, file_path):
+        stat = os.stat(file_path)
+        name = os.path.splitext(os.path.basename(file_path))[0]
+        return os.path.join(self.cache_dir, f"{name}-{stat.st_mtime_ns}-{stat.st_size}.parquet")
+
+    def load(self, file_path):
+        """Return cached features for file_path, or None if the source changed or was never cached."""
+        try:
+            cache_path = self._cache_path(file_path)
+        except OSError:
+            return None
+        if not os.path.exists(cache_path):
+            return None
+        logging.info(f"Loading cached features from {cache_path}")
+        return pd.read_parquet(cache_path)
+
+    def save(self, file_path, features):
+        """Write features for file_path and remove cache files of older versions of the source."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        cache_path = self._cache_path(file_path)
+        name = os.path.splitext(os.path.basename(file_path))[0]
+        # Match only <name>-<mtime>-<size>.parquet, so hotel.csv does not remove the cache of hotel-eu.csv
+        own_version = re.compile(rf"{re.escape(name)}-\d+-\d+\.parquet")
+        for stale in glob.glob(os.path.join(glob.escape(self.cache_dir), f"{glob.escape(name)}-*.parquet")):
+            if stale != cache_path and own_version.fullmatch(os.path.basename(stale)):
+                os.remove(stale)
+        features.to_parquet(cache_path, index=False)
+        logging.info(f"Cached engineered features to {cache_path}")
+
+
+class ModelRegistry:
+    """Versioned model artifacts with JSON metadata (data hash, params, MSE)."""
+
+    def __init__(self, registry_dir='model_registry', name='revenue_forecasting_model'):
+        self.registry_dir = registry_dir
+        self.name = name
+
+    def _versions(self):
+        pattern = os.path.join(self.registry_dir, f"{self.name}-v*.json")
+        versions = []
+        for path in glob.glob(pattern):
+            with open(path) as f:
+                versions.append(json.load(f))
+        return sorted(versions, key=lambda meta: meta['version'])
+
+    def latest(self):
+        """Return the metadata of the newest version, or None if the registry is empty."""
+        versions = self._versions()
+        return versions[-1] if versions else None
+
+    def register(self, model, data_hash, params, mse):
+        """Store the model as the next version and return its metadata."""
+        os.makedirs(self.registry_dir, exist_ok=True)
+        latest = self.latest()
+        version = latest['version'] + 1 if latest else 1
+        artifact = os.path.join(self.registry_dir, f"{self.name}-v{version}.joblib")
+
+        # Uncompressed dumps keep numpy arrays memory-mappable on load
+        joblib.dump(model, artifact, compress=0)
+        meta = {
+            'version': version,
+            'artifact': artifact,
+            'data_hash': data_hash,
+            'params': params,
+            'mse': mse,
+            'created': datetime.now().isoformat(timespec='seconds')
+        }
+        with open(os.path.join(self.registry_dir, f"{self.name}-v{version}.json"), 'w') as f:
+            json.dump(meta, f, indent=2, default=str)
+        logging.info(f"Registered {self.name} v{version} (MSE {mse:.4f})")
+        return meta
+
+    def load_if_fresh(self, data_hash, mmap_mode='r'):
+        """Load the newest model trained on data with this hash, or return (None, None)."""
+        meta = self.latest()
+        if meta is None or meta['data_hash'] != data_hash or not os.path.exists(meta['artifact']):
+            return None, None
+        logging.info(f"Loading {self.name} v{meta['version']} from {meta['artifact']}")
+        return joblib.load(meta['artifact'], mmap_mode=mmap_mode), meta
+
+
+class BookingCube:
+    """Pre-aggregated month x room type x guest type rollup of bookings and revenue."""
+
+    def __init__(self, data, cache_size=256):
+        months = data['BookingDate'].dt.to_period('M')
+        month_codes, self.months = pd.factorize(months, sort=True)
+        room_codes, self.room_types = self._codes(data, 'RoomType')
+        guest_codes, self.guest_types = self._codes(data, 'GuestType')
+
+        # One bincount over the flattened cell index builds every cell in a single pass
+        shape = (len(self.months), len(self.room_types), len(self.guest_types))
+        cell = np.ravel_multi_index((month_codes, room_codes, guest_codes), shape)
+        size = int(np.prod(shape))
+        self.bookings = np.bincount(cell, minlength=size).reshape(shape).astype(np.int32)
+        self.revenue = np.bincount(cell, weights=data['Revenue'].to_numpy(dtype=np.float64),
+                                   minlength=size).reshape(shape)
+        self.month_labels = [str(month) for month in self.months]
+
+        self._query = lru_cache(maxsize=cache_size)(self._aggregate)
+
+    @staticmethod
+    def _codes(data, column):
+        if column not in data.columns:
+            return np.zeros(len(data), dtype=np.intp), ['All']
+        codes, levels = pd.factorize(data[column], sort=True)
+        return codes, [str(level) for level in levels]
+
+    def _aggregate(self, room_types, guest_types, start, end):
+        rooms = [self.room_types.index(r) for r in room_types] if room_types else slice(None)
+        guests = [self.guest_types.index(g) for g in guest_types] if guest_types else slice(None)
+        bookings = self.bookings[start:end + 1][:, rooms][:, :, guests].sum(axis=(1, 2))
+        revenue = self.revenue[start:end + 1][:, rooms][:, :, guests].sum(axis=(1, 2))
+        return pd.DataFrame({
+            'BookingDate': self.month_labels[start:end + 1],
+            'Bookings': bookings,
+            'Revenue': revenue
+        })
+
+    def query(self, room_types=None, guest_types=None, start=0, end=None):
+        """Monthly bookings and revenue for the selected filters; repeated filters are served from an LRU memo."""
+        end = len(self.months) - 1 if end is None else end
+        return self._query(tuple(sorted(room_types or ())), tuple(sorted(guest_types or ())), start, end)
+
+
+# Estimator backends: factory, hyperparameter grid and whether categorical columns are used natively
+ESTIMATOR_BACKENDS = {
+    'hist': {
+        'estimator': lambda categorical_mask: HistGradientBoostingRegressor(
+            max_iter=500, early_stopping=True, validation_fraction=0.1, n_iter_no_change=10,
+            categorical_features=categorical_mask, random_state=42),
+        'param_grid': {'learning_rate': [0.05, 0.1], 'max_leaf_nodes': [15, 31]},
+        'native_categorical': True
+    },
+    'gbr': {
+        'estimator': lambda categorical_mask: GradientBoostingRegressor(random_state=42),
+        'param_grid': {'n_estimators': [100, 200], 'learning_rate': [0.05, 0.1], 'max_depth': [3, 5]},
+        'native_categorical': False
+    }
+}
+
+
 class HospitalityAnalytics:
     """Class for analyzing and forecasting hospitality data."""
 
-    def __init__(self, file_path):
-        self.data = self.load_data(file_path)
+    features = ['Season', 'StayDuration', 'WeekendStay']
+    categorical_features = ['RoomType', 'GuestType']
+
+    def __init__(self, file_path, date_format='%Y-%m-%d', cache_dir='feature_cache', registry_dir='model_registry',
+                 backend='hist'):
+        if backend not in ESTIMATOR_BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}', expected one of {list(ESTIMATOR_BACKENDS)}")
+        self.file_path = file_path
+        self.date_format = date_format
+        self.backend = backend
+        self.feature_store = FeatureStore(cache_dir)
+        self.registry = ModelRegistry(registry_dir, name=f'revenue_forecasting_model_{backend}')
         self.model = None
+        self.model_meta = None
+
+        # Reuse engineered features when the source file is unchanged
+        self.data = self.feature_store.load(file_path)
+        self.preprocessed = self.data is not None
+        if not self.preprocessed:
+            self.data = self.load_data(file_path)
+        else:
+            # Features are ready, so a model trained on the same data can be reused as is
+            self.model, self.model_meta = self.registry.load_if_fresh(self.data_hash())
 
     @staticmethod
     def load_data(file_path):
@@ -40,65 +231,144 @@ class HospitalityAnalytics:
             raise
 
     def preprocess_data(self):
-        """Preprocess the dataset."""
+        """Preprocess the dataset and cache the engineered features."""
+        if self.preprocessed:
+            logging.info("Features loaded from cache, skipping preprocessing")
+            return
+
         logging.info("Preprocessing data")
         if not {'BookingDate', 'CheckInDate', 'CheckOutDate', 'Revenue'}.issubset(self.data.columns):
             raise ValueError("Required columns are missing from the dataset.")
-        self.data['BookingDate'] = pd.to_datetime(self.data['BookingDate'])
-        self.data['CheckInDate'] = pd.to_datetime(self.data['CheckInDate'])
-        self.data['StayDuration'] = (self.data['CheckOutDate'] - self.data['CheckInDate']).dt.days
-        self.data['Season'] = self.data['CheckInDate'].dt.month % 12 // 3 + 1
-        self.data['WeekendStay'] = self.data['CheckInDate'].dt.weekday >= 5
-        self.data = pd.get_dummies(self.data, columns=['RoomType', 'GuestType'], drop_first=True)
+
+        # Explicit formats avoid per-row format inference
+        for col in ['BookingDate', 'CheckInDate', 'CheckOutDate']:
+            self.data[col] = pd.to_datetime(self.data[col], format=self.date_format)
         self.data.dropna(inplace=True)
 
-    def train_model(self):
-        """Train a Gradient Boosting Regressor with hyperparameter tuning."""
-        logging.info("Training Gradient Boosting model")
-        features = ['Season', 'StayDuration', 'WeekendStay']
+        check_in = self.data['CheckInDate'].dt
+        self.data['StayDuration'] = (self.data['CheckOutDate'] - self.data['CheckInDate']).dt.days.astype('int16')
+        self.data['Season'] = (check_in.month % 12 // 3 + 1).astype('int8')
+        self.data['WeekendStay'] = (check_in.weekday >= 5).astype('bool')
+
+        # Categorical codes instead of one-hot dummy columns
+        for col in ['RoomType', 'GuestType']:
+            if col in self.data.columns:
+                self.data[col] = self.data[col].astype('category')
+
+        self.feature_store.save(self.file_path, self.data)
+        self.preprocessed = True
+
+    def model_inputs(self, backend=None):
+        """Return the feature matrix for a backend and its categorical column mask."""
+        backend = backend or self.backend
+        features = list(self.features)
+        if ESTIMATOR_BACKENDS[backend]['native_categorical']:
+            features += [col for col in self.categorical_features if col in self.data.columns]
         if not set(features).issubset(self.data.columns):
             raise ValueError(f"Missing features in dataset: {set(features) - set(self.data.columns)}")
 
-        X = self.data[features]
+        X = self.data[features].copy()
+        categorical_mask = [col in self.categorical_features for col in features]
+        for col in features:
+            if col in self.categorical_features:
+                # Histogram boosting expects small non-negative integer codes for categories
+                X[col] = X[col].astype('category').cat.codes
+        return X, categorical_mask
+
+    def data_hash(self):
+        """Hash of the model features and target, used to decide whether a stored model is fresh."""
+        X, _ = self.model_inputs()
+        hashed = pd.util.hash_pandas_object(X.assign(Revenue=self.data['Revenue']), index=False).values
+        return hashlib.sha256(hashed.tobytes()).hexdigest()
+
+    def train_model(self, force=False):
+        """Train the configured boosting backend with hyperparameter tuning, unless a fresh model is registered."""
+        if not force:
+            if self.model is None:
+                self.model, self.model_meta = self.registry.load_if_fresh(self.data_hash())
+            if self.model is not None:
+                logging.info(f"Using registered model v{self.model_meta['version']}, skipping training")
+                return self.model_meta['mse']
+
+        logging.info(f"Training gradient boosting model (backend: {self.backend})")
+        X, categorical_mask = self.model_inputs()
         y = self.data['Revenue']
 
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
 
-        model = GradientBoostingRegressor(random_state=42)
-        param_grid = {'n_estimators': [100, 200], 'learning_rate': [0.05, 0.1], 'max_depth': [3, 5]}
-        grid_search = GridSearchCV(model, param_grid, cv=5, scoring='neg_mean_squared_error')
+        backend = ESTIMATOR_BACKENDS[self.backend]
+        model = backend['estimator'](categorical_mask)
+        grid_search = GridSearchCV(model, backend['param_grid'], cv=5, scoring='neg_mean_squared_error')
         grid_search.fit(X_train, y_train)
 
         self.model = grid_search.best_estimator_
-        joblib.dump(self.model, 'revenue_forecasting_model.pkl')
 
         predictions = self.model.predict(X_test)
         mse = mean_squared_error(y_test, predictions)
         logging.info(f"Model Mean Squared Error: {mse}")
+
+        self.model_meta = self.registry.register(self.model, self.data_hash(), grid_search.best_params_, mse)
         return mse
 
-    def visualize_trends(self):
-        """Create interactive visualizations for booking trends."""
+    def benchmark_backends(self, backends=('gbr', 'hist')):
+        """Compare a single fit of each backend (default parameters) on the same split by fit time and MSE."""
+        results = []
+        for backend in backends:
+            X, categorical_mask = self.model_inputs(backend)
+            X_train, X_test, y_train, y_test = train_test_split(X, self.data['Revenue'], test_size=0.2, random_state=42)
+            model = ESTIMATOR_BACKENDS[backend]['estimator'](categorical_mask)
+
+            start = time.perf_counter()
+            model.fit(X_train, y_train)
+            fit_seconds = time.perf_counter() - start
+
+            mse = mean_squared_error(y_test, model.predict(X_test))
+            results.append({'backend': backend, 'features': X.shape[1], 'fit_seconds': fit_seconds, 'mse': mse})
+            logging.info(f"Benchmark {backend}: fit {fit_seconds:.3f}s, MSE {mse:.4f}")
+        return pd.DataFrame(results)
+
+    def visualize_trends(self, host='0.0.0.0', port=8050):
+        """Create interactive visualizations for booking trends, served from a pre-aggregated rollup cube."""
         logging.info("Visualizing booking trends")
-        trend_data = self.data.groupby(self.data['BookingDate'].dt.to_period('M')).size()
-        trend_df = trend_data.reset_index(name='Bookings')
-        trend_df['BookingDate'] = trend_df['BookingDate'].astype(str)
+        cube = BookingCube(self.data)
+        last_month = len(cube.months) - 1
 
         app = dash.Dash(__name__)
         app.layout = html.Div([
-            dcc.Graph(
-                figure=px.line(trend_df, x='BookingDate', y='Bookings', title='Monthly Booking Trends')
-            )
+            dcc.Dropdown(id='room-type', options=cube.room_types, multi=True, placeholder='Room type'),
+            dcc.Dropdown(id='guest-type', options=cube.guest_types, multi=True, placeholder='Guest type'),
+            dcc.RangeSlider(id='month-range', min=0, max=last_month, step=1, value=[0, last_month],
+                            marks={i: cube.month_labels[i] for i in range(0, last_month + 1, max(1, last_month // 12))}),
+            dcc.Graph(id='booking-trends')
         ])
 
+        @app.callback(
+            Output('booking-trends', 'figure'),
+            Input('room-type', 'value'),
+            Input('guest-type', 'value'),
+            Input('month-range', 'value')
+        )
+        def update_trends(room_types, guest_types, month_range):
+            trend_df = cube.query(room_types, guest_types, month_range[0], month_range[1])
+            return px.line(trend_df, x='BookingDate', y='Bookings', hover_data=['Revenue'], title='Monthly Booking Trends')
+
         if __name__ == '__main__':
-            app.run_server(debug=True)
+            if serve is not None:
+                logging.info(f"Serving dashboard with waitress on {host}:{port}")
+                serve(app.server, host=host, port=port)
+            else:
+                logging.warning("waitress is not installed, falling back to the Dash development server")
+                app.run(host=host, port=port, debug=False)
+        return app
 
 
 # Main Execution
 file_path = 'hospitality_data.csv'
-analytics = HospitalityAnalytics(file_path)
-analytics.preprocess_data()
-analytics.train_model()
-analytics.visualize_trends()
-
+with log_duration("Loading data"):
+    analytics = HospitalityAnalytics(file_path)
+with log_duration("Preprocessing"):
+    analytics.preprocess_data()
+with log_duration("Model training"):
+    analytics.train_model()
+with log_duration("Visualization"):
+    analytics.visualize_trends()
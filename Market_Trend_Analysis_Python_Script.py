@@ -1,12 +1,18 @@
+import os
+import time
+import copy
+import hashlib
+import tracemalloc
 import pandas as pd
 import numpy as np
 from sklearn.preprocessing import StandardScaler
 from sklearn.impute import SimpleImputer
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.cluster import KMeans
-from sklearn.model_selection import GridSearchCV, KFold
+from sklearn.model_selection import GridSearchCV, KFold, ParameterGrid, ParameterSampler
 from imblearn.over_sampling import SMOTE
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 import seaborn as sns
 
 # Step 1: Load the data from the CSV file
@@ -50,30 +56,92 @@ def calculate_dynamic_metrics(data):
         print(f"Error in calculating dynamic metrics: {e}")
         return data
 
+# Step 5a: Budgeted Random Forest tuning (randomized search + warm_start tree growth + OOB scoring)
+def budgeted_rf_search(X, y, param_distributions=None, n_estimators_steps=(50, 100, 200),
+                       max_fits=30, time_budget=None, random_state=42):
+    """
+    Randomized search over forest shapes under a fit-count and/or wall-clock budget.
+    Each candidate grows its trees incrementally with warm_start, so the n_estimators
+    steps share work, and is scored with the out-of-bag R^2 instead of K-fold refits.
+    Returns the best fitted model, its parameters and the number of fits used.
+    """
+    if param_distributions is None:
+        param_distributions = {
+            'max_depth': [10, 20, 30],
+            'min_samples_split': [2, 5, 10]
+        }
+
+    # Each candidate costs at least one fit, so max_fits candidates always cover the budget;
+    # the loop below stops on fits used, and a finite grid is never sampled beyond its size
+    n_candidates = max_fits or 10
+    if not any(hasattr(values, 'rvs') for values in param_distributions.values()):
+        n_candidates = min(n_candidates, len(ParameterGrid(param_distributions)))
+    candidates = ParameterSampler(param_distributions, n_iter=n_candidates, random_state=random_state)
+
+    start = time.perf_counter()
+    best_model, best_params, best_score = None, None, -np.inf
+    fits_used = 0
+
+    def budget_left():
+        if max_fits is not None and fits_used >= max_fits:
+            return False
+        return time_budget is None or time.perf_counter() - start < time_budget
+
+    for params in candidates:
+        if not budget_left():
+            break
+        rf = RandomForestRegressor(warm_start=True, oob_score=True, bootstrap=True,
+                                   n_jobs=-1, random_state=random_state, **params)
+        for n_estimators in n_estimators_steps:
+            if not budget_left():
+                break
+
+            # Only the newly added trees are fitted on each step
+            rf.set_params(n_estimators=n_estimators)
+            rf.fit(X, y)
+            fits_used += 1
+
+            if rf.oob_score_ > best_score:
+                best_score = rf.oob_score_
+                best_params = dict(params, n_estimators=n_estimators)
+                best_model = copy.deepcopy(rf)
+
+    print(f"Budgeted RF search: {fits_used} fits in {time.perf_counter() - start:.1f}s, "
+          f"best OOB R^2 {best_score:.4f} with {best_params}")
+    return best_model, best_params, fits_used
+
 # Step 5: AI-Powered Sentiment-Driven Sales Prediction using Random Forest with Hyperparameter Tuning
-def ai_sales_forecast(data):
+def ai_sales_forecast(data, tuning='grid', max_fits=30, time_budget=None):
+    """
+    tuning='grid' runs the exhaustive GridSearchCV; tuning='budget' uses budgeted_rf_search,
+    whose cost is capped by max_fits (forest growth steps) and time_budget (seconds).
+    """
     try:
         X = data[['Customer_Sentiment', 'Ad_Spend', 'ASEI']]
         y = data['Sales_Volume']
 
         X_balanced, y_balanced = balance_data(X, y)
 
-        rf = RandomForestRegressor(random_state=42)
+        if tuning == 'budget':
+            best_rf_model, _, _ = budgeted_rf_search(X_balanced, y_balanced,
+                                                     max_fits=max_fits, time_budget=time_budget)
+        else:
+            rf = RandomForestRegressor(random_state=42)
 
-        # Hyperparameter Tuning using GridSearchCV
-        param_grid = {
-            'n_estimators': [50, 100, 200],
-            'max_depth': [10, 20, 30],
-            'min_samples_split': [2, 5, 10]
-        }
+            # Hyperparameter Tuning using GridSearchCV
+            param_grid = {
+                'n_estimators': [50, 100, 200],
+                'max_depth': [10, 20, 30],
+                'min_samples_split': [2, 5, 10]
+            }
 
-        # Cross-validation setup
-        kfold = KFold(n_splits=5, shuffle=True, random_state=42)
-        grid_search = GridSearchCV(rf, param_grid, cv=kfold, n_jobs=-1)
+            # Cross-validation setup
+            kfold = KFold(n_splits=5, shuffle=True, random_state=42)
+            grid_search = GridSearchCV(rf, param_grid, cv=kfold, n_jobs=-1)
 
-        # Fitting the model with best parameters
-        grid_search.fit(X_balanced, y_balanced)
-        best_rf_model = grid_search.best_estimator_
+            # Fitting the model with best parameters
+            grid_search.fit(X_balanced, y_balanced)
+            best_rf_model = grid_search.best_estimator_
 
         # Predict future sales based on customer sentiment
         data['Predicted_Sales_RF'] = best_rf_model.predict(X)
@@ -173,71 +241,236 @@ def generate_report(data):
         print(f"Error generating report: {e}")
         return "Error in generating report."
 
+def _hexbin_dominant(x, y, labels, gridsize):
+    """
+    Assign points to the same hexagonal grid matplotlib's hexbin uses for this extent and find each
+    hexagon's most frequent label with one bincount. Returns hexagon centres, their dominant labels
+    and the extent to pass to hexbin, so the work per point is vectorized and the plot is per hexagon.
+    """
+    x, y, labels = np.asarray(x, dtype=float), np.asarray(y, dtype=float), np.asarray(labels, dtype=np.int64)
+    nx, ny = gridsize, int(gridsize / np.sqrt(3))
+    xmin, xmax, ymin, ymax = x.min(), x.max(), y.min(), y.max()
+    sx = (xmax - xmin) / nx or 1.0
+    sy = (ymax - ymin) / ny or 1.0
+    ix, iy = (x - xmin) / sx, (y - ymin) / sy
+
+    # Two offset rectangular lattices; each point goes to the nearer centre, as in matplotlib
+    ix1, iy1 = np.round(ix).astype(np.int64), np.round(iy).astype(np.int64)
+    ix2 = np.minimum(np.floor(ix).astype(np.int64), nx - 1)
+    iy2 = np.minimum(np.floor(iy).astype(np.int64), ny - 1)
+    on_first = (ix - ix1) ** 2 + 3.0 * (iy - iy1) ** 2 < (ix - ix2 - 0.5) ** 2 + 3.0 * (iy - iy2 - 0.5) ** 2
+    first_size = (nx + 1) * (ny + 1)
+    hex_index = np.where(on_first, ix1 * (ny + 1) + iy1, first_size + ix2 * ny + iy2)
+
+    num_labels = labels.max() + 1
+    counts = np.bincount(hex_index * num_labels + labels,
+                         minlength=(first_size + nx * ny) * num_labels).reshape(-1, num_labels)
+    occupied = np.flatnonzero(counts.sum(axis=1))
+    first = occupied < first_size
+    second = occupied[~first] - first_size
+    centre_x = np.concatenate([xmin + (occupied[first] // (ny + 1)) * sx, xmin + (second // ny + 0.5) * sx])
+    centre_y = np.concatenate([ymin + (occupied[first] % (ny + 1)) * sy, ymin + (second % ny + 0.5) * sy])
+    dominant = counts[np.concatenate([occupied[first], occupied[~first]])].argmax(axis=1)
+    return centre_x, centre_y, dominant, (xmin, xmax, ymin, ymax)
+
 # Step 11: Visualize the Market Trends with enhanced visuals
-def visualize_trends(data):
+def visualize_trends(data, fast=False, show_ci=False, output_path=None, gridsize=60):
+    """
+    fast=True aggregates before drawing: hexbin density for the scatter plots and per-date
+    means for the market share lines, so render time depends on the bins, not on the rows.
+    show_ci enables seaborn's bootstrapped confidence bands (off by default).
+    output_path renders to a standalone Figure and writes a PNG instead of calling plt.show(),
+    leaving pyplot's backend and figure state untouched.
+    """
     try:
-        plt.figure(figsize=(15, 10))
+        fig = Figure(figsize=(15, 10)) if output_path is not None else plt.figure(figsize=(15, 10))
 
         # Visualization 1: Sales Volume vs Predicted Sales by Random Forest
-        plt.subplot(2, 2, 1)
-        sns.regplot(x='Predicted_Sales_RF', y='Sales_Volume', data=data, scatter_kws={'s':100}, line_kws={'color':'red'})
-        plt.title('Actual vs Predicted Sales (Random Forest)', fontsize=14)
-        plt.xlabel('Predicted Sales (RF)')
-        plt.ylabel('Actual Sales Volume')
-        plt.grid(True)
+        ax = fig.add_subplot(2, 2, 1)
+        if fast:
+            density = ax.hexbin(data['Predicted_Sales_RF'], data['Sales_Volume'], gridsize=gridsize, cmap='Blues', mincnt=1)
+            fig.colorbar(density, ax=ax, label='Count')
+            slope, intercept = np.polyfit(data['Predicted_Sales_RF'], data['Sales_Volume'], 1)
+            x_range = np.array([data['Predicted_Sales_RF'].min(), data['Predicted_Sales_RF'].max()])
+            ax.plot(x_range, slope * x_range + intercept, color='red')
+        else:
+            sns.regplot(x='Predicted_Sales_RF', y='Sales_Volume', data=data, ci=95 if show_ci else None,
+                        scatter_kws={'s':100}, line_kws={'color':'red'}, ax=ax)
+        ax.set_title('Actual vs Predicted Sales (Random Forest)', fontsize=14)
+        ax.set_xlabel('Predicted Sales (RF)')
+        ax.set_ylabel('Actual Sales Volume')
+        ax.grid(True)
 
         # Visualization 2: Dynamic Market Share Over Time
-        plt.subplot(2, 2, 2)
-        sns.lineplot(x='Date', y='Adjusted_Market_Share', hue='Product_Category', data=data, marker='o')
-        plt.title('Dynamic Market Share Over Time', fontsize=14)
-        plt.xlabel('Date')
-        plt.ylabel('Adjusted Market Share')
-        plt.grid(True)
+        ax = fig.add_subplot(2, 2, 2)
+        if fast:
+            daily_share = (data.assign(Date=pd.to_datetime(data['Date']))
+                           .groupby(['Product_Category', 'Date'], observed=True)['Adjusted_Market_Share']
+                           .mean())
+            for category, series in daily_share.groupby(level=0):
+                ax.plot(series.index.get_level_values('Date'), series.values, marker='o', markersize=3, label=category)
+            ax.legend(title='Product_Category')
+        else:
+            sns.lineplot(x='Date', y='Adjusted_Market_Share', hue='Product_Category', data=data, marker='o',
+                         errorbar=('ci', 95) if show_ci else None, ax=ax)
+        ax.set_title('Dynamic Market Share Over Time', fontsize=14)
+        ax.set_xlabel('Date')
+        ax.set_ylabel('Adjusted Market Share')
+        ax.grid(True)
 
         # Visualization 3: Cluster Heatmap for Hidden Patterns
-        plt.subplot(2, 2, 3)
+        ax = fig.add_subplot(2, 2, 3)
         cluster_data = data[['Sales_Volume', 'Customer_Sentiment', 'Ad_Spend', 'Trend_Cluster']].pivot_table(index='Trend_Cluster')
-        sns.heatmap(cluster_data, cmap='coolwarm', annot=True, fmt='.2f')
-        plt.title('Cluster Analysis Heatmap', fontsize=14)
-        plt.xlabel('Features')
-        plt.ylabel('Cluster')
+        sns.heatmap(cluster_data, cmap='coolwarm', annot=True, fmt='.2f', ax=ax)
+        ax.set_title('Cluster Analysis Heatmap', fontsize=14)
+        ax.set_xlabel('Features')
+        ax.set_ylabel('Cluster')
 
         # Visualization 4: Sales Volume vs ASEI (Ad Spend Efficiency Index)
-        plt.subplot(2, 2, 4)
-        sns.scatterplot(x='ASEI', y='Sales_Volume', hue='Trend_Cluster', size='Sales_Volume', sizes=(50, 200), data=data)
-        plt.title('Sales Volume vs ASEI (with Clusters)', fontsize=14)
-        plt.xlabel('Ad Spend Efficiency Index (ASEI)')
-        plt.ylabel('Sales Volume')
-        plt.grid(True)
-
-        plt.tight_layout()
-        plt.show()
+        ax = fig.add_subplot(2, 2, 4)
+        if fast:
+            # Colour each hexagon by its dominant cluster; hexbin only receives one point per hexagon
+            centre_x, centre_y, dominant, extent = _hexbin_dominant(data['ASEI'], data['Sales_Volume'],
+                                                                    data['Trend_Cluster'], gridsize)
+            clusters = ax.hexbin(centre_x, centre_y, C=dominant, reduce_C_function=np.max, extent=extent,
+                                 gridsize=gridsize, cmap='tab10', mincnt=1)
+            fig.colorbar(clusters, ax=ax, label='Trend_Cluster')
+        else:
+            sns.scatterplot(x='ASEI', y='Sales_Volume', hue='Trend_Cluster', size='Sales_Volume', sizes=(50, 200),
+                            data=data, ax=ax)
+        ax.set_title('Sales Volume vs ASEI (with Clusters)', fontsize=14)
+        ax.set_xlabel('Ad Spend Efficiency Index (ASEI)')
+        ax.set_ylabel('Sales Volume')
+        ax.grid(True)
+
+        fig.tight_layout()
+        if output_path is not None:
+            fig.savefig(output_path, dpi=100)
+        else:
+            plt.show()
 
     except Exception as e:
         print(f"Error in visualization: {e}")
 
+# Step 12: Columnar pipeline executor with on-disk step cache
+class PipelineStep:
+    """
+    A workflow step that reads `inputs` and writes `outputs` columns.
+    inputs=None means the step reads every column; outputs=None means it rewrites the whole frame.
+    """
+
+    def __init__(self, name, func, inputs=None, outputs=None, params=None):
+        self.name = name
+        self.func = func
+        self.inputs = inputs
+        self.outputs = outputs
+        self.params = params or {}
+
+def _step_cache_key(data, step):
+    """Hash the step's input columns (values and index), its name and its parameters."""
+    columns = list(data.columns) if step.inputs is None else list(step.inputs)
+    digest = hashlib.sha256()
+    digest.update(step.name.encode())
+    digest.update(repr(sorted(step.params.items())).encode())
+    digest.update(repr(columns).encode())
+    digest.update(pd.util.hash_pandas_object(data[columns], index=True).values.tobytes())
+    return digest.hexdigest()[:16]
+
+def run_pipeline(data, steps, cache_dir='.market_trend_cache', use_cache=True, profile_memory=False):
+    """
+    Run the steps in declaration order. Each step's outputs are cached as Parquet, keyed by
+    the hash of its inputs and parameters, so only steps whose inputs or parameters changed rerun.
+    Returns the final frame and a per-step profile (status, seconds, peak memory in MB).
+    Peak memory is only traced with profile_memory=True, since tracemalloc slows steps down several
+    times; timings from such a run are inflated accordingly.
+    """
+    if use_cache:
+        os.makedirs(cache_dir, exist_ok=True)
+
+    profile = []
+    for step in steps:
+        if step.inputs is not None:
+            missing = set(step.inputs) - set(data.columns)
+            if missing:
+                raise ValueError(f"Step '{step.name}' is missing input columns: {missing}")
+
+        key = _step_cache_key(data, step)
+        cache_path = os.path.join(cache_dir, f"{step.name}-{key}.parquet")
+
+        start = time.perf_counter()
+        if profile_memory:
+            tracemalloc.start()
+        try:
+            if use_cache and os.path.exists(cache_path):
+                cached = pd.read_parquet(cache_path)
+                cached.index = data.index
+                if step.outputs is None:
+                    data = cached
+                else:
+                    for col in step.outputs:
+                        data[col] = cached[col]
+                status = 'cached'
+            else:
+                data = step.func(data, **step.params)
+
+                # Steps report their own errors and return the frame unchanged, so check the outputs
+                outputs = list(data.columns) if step.outputs is None else list(step.outputs)
+                missing = set(outputs) - set(data.columns)
+                if missing:
+                    raise RuntimeError(f"Step '{step.name}' did not produce columns: {missing}")
+
+                if use_cache:
+                    data[outputs].reset_index(drop=True).to_parquet(cache_path, index=False)
+                status = 'ran'
+        finally:
+            if profile_memory:
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+        profile.append({
+            'step': step.name,
+            'status': status,
+            'seconds': round(time.perf_counter() - start, 4),
+            'peak_mb': round(peak / 1e6, 2) if profile_memory else None
+        })
+
+    for entry in profile:
+        memory = f"{entry['peak_mb']:>9.2f} MB" if entry['peak_mb'] is not None else ''
+        print(f"{entry['step']:<32} {entry['status']:<7} {entry['seconds']:>9.3f}s {memory}")
+
+    return data, profile
+
+def market_trend_pipeline(tuning='grid', min_clusters=2, max_clusters=10):
+    """Declare the full workflow as a pipeline of steps with their input and output columns."""
+    return [
+        PipelineStep('handle_missing_values', handle_missing_values),
+        PipelineStep('calculate_dynamic_metrics', calculate_dynamic_metrics,
+                     inputs=['Sales_Volume', 'Ad_Spend', 'Market_Share'],
+                     outputs=['ASEI', 'Adjusted_Market_Share']),
+        PipelineStep('ai_sales_forecast', ai_sales_forecast,
+                     inputs=['Customer_Sentiment', 'Ad_Spend', 'ASEI', 'Sales_Volume'],
+                     outputs=['Predicted_Sales_RF'],
+                     params={'tuning': tuning}),
+        PipelineStep('time_series_clustering', time_series_clustering,
+                     inputs=['Sales_Volume', 'Ad_Spend', 'Customer_Sentiment'],
+                     outputs=['Trend_Cluster'],
+                     params={'min_clusters': min_clusters, 'max_clusters': max_clusters}),
+        PipelineStep('social_media_sentiment_tracking', social_media_sentiment_tracking,
+                     inputs=[],
+                     outputs=['Social_Sentiment', 'Sentiment_Alert']),
+        PipelineStep('recommendation_system', recommendation_system,
+                     inputs=['ASEI', 'Product_Category', 'Trend_Cluster'],
+                     outputs=['Marketing_Recommendation'])
+    ]
+
 # Full workflow
 file_path = 'market_trend_data.csv'
 market_trend_data = load_data(file_path)
 
 if market_trend_data is not None:
-    # Handle missing values
-    market_trend_data = handle_missing_values(market_trend_data)
-
-    # Apply dynamic metrics
-    market_trend_data = calculate_dynamic_metrics(market_trend_data)
-
-    # Apply AI-Powered Sales Forecasting
-    market_trend_data = ai_sales_forecast(market_trend_data)
-
-    # Apply time series clustering
-    market_trend_data = time_series_clustering(market_trend_data)
-
-    # Apply social media sentiment tracking
-    market_trend_data = social_media_sentiment_tracking(market_trend_data)
-
-    # Generate marketing recommendations
-    market_trend_data = recommendation_system(market_trend_data)
+    # Run missing value handling, dynamic metrics, sales forecasting, clustering,
+    # social sentiment tracking and recommendations, reusing cached step outputs
+    market_trend_data, pipeline_profile = run_pipeline(market_trend_data, market_trend_pipeline())
 
     # Automatically generate insights and report
     ai_insights = ai_interpreter(market_trend_data)
@@ -252,4 +485,3 @@ if market_trend_data is not None:
     
     # Visualize market trends
     visualize_trends(market_trend_data)
-
@@ -6,39 +6,248 @@
 
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import train_test_split, TimeSeriesSplit
 from sklearn.linear_model import LinearRegression
-from sklearn.ensemble import GradientBoostingRegressor
+from sklearn.ensemble import GradientBoostingRegressor, HistGradientBoostingRegressor
 from sklearn.metrics import mean_squared_error, r2_score
-from scipy import stats
-import matplotlib.pyplot as plt
+from sklearn.pipeline import Pipeline
+from sklearn.compose import ColumnTransformer
+from sklearn.preprocessing import OrdinalEncoder
+from scipy import stats, sparse
+from scipy.sparse.linalg import spsolve
+from collections import namedtuple
+from contextlib import contextmanager
+from math import factorial
+from matplotlib.figure import Figure
 import seaborn as sns
+import os
+import sys
+import shutil
+from urllib.parse import quote
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 import sqlalchemy
+import joblib
+import time
+import json
+import tempfile
+import multiprocessing
+import tracemalloc
 import logging
 
+try:
+    import resource  # POSIX only; used for peak RSS in run profiles
+except ImportError:
+    resource = None
+
 # Logging setup for tracking progress
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger()
 
-def load_performance_data(sql_connection_string):
+DEFAULT_CHANNELS = ('Paid Search', 'Social Media', 'Display')
+
+# Low-cardinality text columns are read as categoricals to keep frames compact
+DTYPE_HINTS = {'channel': 'category', 'campaign_type': 'category'}
+
+# Engines (and their connection pools) are created once per connection string
+_engines = {}
+
+def get_engine(sql_connection_string):
+    """
+    Return a pooled SQLAlchemy engine for the connection string, creating it on first use.
+    """
+    if sql_connection_string not in _engines:
+        _engines[sql_connection_string] = sqlalchemy.create_engine(sql_connection_string, pool_pre_ping=True)
+    return _engines[sql_connection_string]
+
+def build_performance_query(start_date, end_date=None, channels=DEFAULT_CHANNELS, columns=None):
+    """
+    Build a parameterized SELECT on marketing_performance_data for a date range, channel list and column projection.
+    """
+    names = set(columns or []) | {'date', 'channel'}
+    table = sqlalchemy.table('marketing_performance_data', *[sqlalchemy.column(name) for name in names])
+    selected = [table.c[name] for name in columns] if columns else [sqlalchemy.text('*')]
+    query = sqlalchemy.select(*selected).select_from(table).where(table.c.date >= str(start_date))
+    if end_date is not None:
+        query = query.where(table.c.date < str(end_date))
+    if channels:
+        query = query.where(table.c.channel.in_(list(channels)))
+    return query
+
+def _apply_dtype_hints(chunk, dtype_hints):
+    hints = {col: dtype for col, dtype in dtype_hints.items() if col in chunk.columns}
+    return chunk.astype(hints) if hints else chunk
+
+def _concat_chunks(chunks):
+    """
+    Concatenate chunks, keeping categorical columns categorical even when chunks saw different categories.
+    """
+    if not chunks:
+        return pd.DataFrame()
+    data = pd.concat(chunks, ignore_index=True)
+    for col in chunks[0].columns:
+        if isinstance(chunks[0][col].dtype, pd.CategoricalDtype) and not isinstance(data[col].dtype, pd.CategoricalDtype):
+            data[col] = pd.api.types.union_categoricals([chunk[col] for chunk in chunks])
+    return data
+
+def iter_performance_data(sql_connection_string, start_date='2023-01-01', end_date=None, channels=DEFAULT_CHANNELS,
+                          columns=None, chunksize=100_000, dtype_hints=DTYPE_HINTS):
+    """
+    Stream marketing performance rows from SQL in chunks of at most chunksize rows.
+    Results are read through a server-side cursor (stream_results) where the driver supports one, so
+    psycopg2 on PostgreSQL does not buffer the whole result set on the client before the first chunk.
+    """
+    query = build_performance_query(start_date, end_date, channels, columns)
+    with get_engine(sql_connection_string).connect() as connection:
+        connection = connection.execution_options(stream_results=True, max_row_buffer=chunksize)
+        for chunk in pd.read_sql(query, connection, chunksize=chunksize):
+            yield _apply_dtype_hints(chunk, dtype_hints)
+
+def check_streaming_reads(sql_connection_string='sqlite://', chunksize=2):
+    """
+    Verify that iter_performance_data executes its query with stream_results enabled and yields
+    bounded chunks, using a small in-memory SQLite table. Raises AssertionError on failure.
+    """
+    engine = get_engine(sql_connection_string)
+    pd.DataFrame({'date': ['2024-01-01', '2024-01-02', '2024-01-03', '2024-01-04', '2024-01-05'],
+                  'channel': ['Display'] * 5, 'campaign_type': ['A', 'B', 'A', 'B', 'A'],
+                  'spend': [1.0] * 5, 'conversions': [1] * 5, 'roi': [0.5] * 5}).to_sql(
+        'marketing_performance_data', engine, index=False, if_exists='replace')
+
+    stream_options = []
+    def record_options(conn, cursor, statement, parameters, context, executemany):
+        if 'marketing_performance_data' in statement:
+            stream_options.append(context.execution_options.get('stream_results'))
+
+    sqlalchemy.event.listen(engine, 'before_cursor_execute', record_options)
+    try:
+        chunks = list(iter_performance_data(sql_connection_string, '2024-01-01', channels=None, chunksize=chunksize))
+    finally:
+        sqlalchemy.event.remove(engine, 'before_cursor_execute', record_options)
+    assert stream_options == [True], f"Query was not executed with stream_results: {stream_options}"
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1], f"Unexpected chunk sizes: {[len(c) for c in chunks]}"
+    logger.info("Streaming read check passed: stream_results is set and chunks are bounded.")
+
+def _month_partitions(start_date, end_date):
+    starts = pd.date_range(pd.Timestamp(start_date).to_period('M').to_timestamp(), end_date, freq='MS')
+    bounds = [pd.Timestamp(start_date)] + list(starts[1:]) + [pd.Timestamp(end_date)]
+    return [(lower.strftime('%Y-%m-%d'), upper.strftime('%Y-%m-%d'))
+            for lower, upper in zip(bounds[:-1], bounds[1:]) if lower < upper]
+
+def load_performance_data(sql_connection_string, start_date='2023-01-01', end_date=None, channels=DEFAULT_CHANNELS,
+                          columns=None, chunksize=100_000, parallel_months=False, max_workers=4,
+                          dtype_hints=DTYPE_HINTS):
     """
     Load data from SQL database containing marketing performance metrics.
+    Rows are read in chunks with categorical dtype hints; with parallel_months, each calendar
+    month between start_date and end_date (default: tomorrow) is read concurrently over the pooled engine.
     """
+    logger.info("Connecting to SQL database...")
     try:
-        logger.info("Connecting to SQL database...")
-        engine = sqlalchemy.create_engine(sql_connection_string)
-        query = """
-        SELECT * FROM marketing_performance_data
-        WHERE date >= '2023-01-01' AND channel IN ('Paid Search', 'Social Media', 'Display')
-        """
-        data = pd.read_sql(query, engine)
-        logger.info(f"Loaded {data.shape[0]} records from SQL database.")
+        if parallel_months:
+            end_date = end_date or (pd.Timestamp.today().normalize() + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+
+            def read_month(bounds):
+                return _concat_chunks(list(iter_performance_data(sql_connection_string, bounds[0], bounds[1], channels,
+                                                                 columns, chunksize, dtype_hints)))
+
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                chunks = [chunk for chunk in executor.map(read_month, _month_partitions(start_date, end_date))
+                          if not chunk.empty]
+        else:
+            chunks = list(iter_performance_data(sql_connection_string, start_date, end_date, channels,
+                                                columns, chunksize, dtype_hints))
+        data = _concat_chunks(chunks)
     except Exception as e:
         logger.error(f"Error loading data: {e}")
-        data = pd.DataFrame()
+        raise
+    logger.info(f"Loaded {data.shape[0]} records from SQL database.")
     return data
 
+def _month_cache_dir(cache_dir, month):
+    return os.path.join(cache_dir, f"month={month}")
+
+def _write_month_cache(cache_dir, month, data):
+    """
+    Write one closed month to cache_dir/month=YYYY-MM/channel=<name>/part.parquet and mark it complete.
+    """
+    month_dir = _month_cache_dir(cache_dir, month)
+    shutil.rmtree(month_dir, ignore_errors=True)
+    os.makedirs(month_dir)
+    for channel, part in data.groupby('channel', observed=True):
+        channel_dir = os.path.join(month_dir, f"channel={quote(str(channel), safe='')}")
+        os.makedirs(channel_dir)
+        part.to_parquet(os.path.join(channel_dir, 'part.parquet'), index=False)
+    open(os.path.join(month_dir, '_SUCCESS'), 'w').close()
+
+def _read_month_cache(cache_dir, month, channels, columns):
+    """
+    Read the cached partitions of one month for the given channels, or for every cached channel when channels is None.
+    """
+    month_dir = _month_cache_dir(cache_dir, month)
+    if channels is None:
+        channel_dirs = sorted(name for name in os.listdir(month_dir) if name.startswith('channel='))
+    else:
+        channel_dirs = [f"channel={quote(str(channel), safe='')}" for channel in channels]
+    parts = []
+    for channel_dir in channel_dirs:
+        path = os.path.join(month_dir, channel_dir, 'part.parquet')
+        if os.path.exists(path):
+            parts.append(pd.read_parquet(path, columns=columns, memory_map=True))
+    return parts
+
+def cached_performance_data(sql_connection_string, start_date='2023-01-01', end_date=None, channels=DEFAULT_CHANNELS,
+                            columns=None, cache_dir='marketing_cache', chunksize=100_000):
+    """
+    Load marketing performance data through a local Parquet cache partitioned by month and channel.
+    Closed months are read from disk (memory-mapped) and fetched from SQL only on a cache miss;
+    the open month (the current calendar month) is always read from SQL.
+    """
+    end_date = end_date or (pd.Timestamp.today().normalize() + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+    open_month = pd.Timestamp.today().to_period('M')
+    if columns is not None:
+        columns = list(dict.fromkeys(list(columns) + ['date', 'channel']))
+
+    chunks, sql_months = [], []
+    for lower, upper in _month_partitions(start_date, end_date):
+        month = pd.Timestamp(lower).to_period('M')
+        if month >= open_month:
+            sql_months.append((lower, upper))
+            continue
+
+        if not os.path.exists(os.path.join(_month_cache_dir(cache_dir, month), '_SUCCESS')):
+            # Cache whole months for every channel so later queries with other filters can reuse them
+            logger.info(f"Caching closed month {month} from SQL database...")
+            month_start = month.start_time.strftime('%Y-%m-%d')
+            month_end = (month + 1).start_time.strftime('%Y-%m-%d')
+            _write_month_cache(cache_dir, month, load_performance_data(
+                sql_connection_string, month_start, month_end, channels=None, chunksize=chunksize))
+
+        for part in _read_month_cache(cache_dir, month, channels, columns):
+            # Partial months at the edges of the range are trimmed after reading
+            part_dates = pd.to_datetime(part['date'])
+            part = part[(part_dates >= pd.Timestamp(lower)) & (part_dates < pd.Timestamp(upper))]
+            chunks.append(_apply_dtype_hints(part, DTYPE_HINTS))
+
+    for lower, upper in sql_months:
+        chunks.append(load_performance_data(sql_connection_string, lower, upper, channels, columns, chunksize))
+
+    data = _concat_chunks([chunk for chunk in chunks if not chunk.empty])
+    logger.info(f"Loaded {data.shape[0]} records ({len(sql_months)} open month(s) from SQL, the rest from cache).")
+    return data
+
+def invalidate_cache(cache_dir='marketing_cache', months=None):
+    """
+    Delete cached months (e.g. ['2024-01']), or the whole cache when months is None.
+    """
+    if months is None:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        logger.info(f"Removed marketing data cache at {cache_dir}.")
+        return
+    for month in months:
+        shutil.rmtree(_month_cache_dir(cache_dir, pd.Period(month, 'M')), ignore_errors=True)
+        logger.info(f"Removed cached month {month}.")
+
 def preprocess_data(data):
     """
     Preprocess data by handling missing values and converting date column to datetime.
@@ -49,65 +258,345 @@ def preprocess_data(data):
     logger.info("Data preprocessing completed.")
     return data
 
-def performance_analysis(data):
+# Additive per-(date, channel) sums; every reported KPI is derived from these, so tables can be merged by addition
+# cpa_sum/cpa_count add up per-row CPA over rows with conversions, so Average CPA stays a per-row mean
+KPI_SUMS = ['spend', 'conversions', 'roi_sum', 'roi_count', 'cpa_sum', 'cpa_count', 'rows']
+
+def kpi_table(data):
+    """
+    Aggregate the performance data into one small table of additive KPI sums per date and channel.
+    This is the only full scan of the data; plotting, profitability and dashboard metrics read from the result.
+    """
+    converted = data['conversions'] > 0
+    row_cpa = data['spend'] / data['conversions'].where(converted)
+    grouped = data.assign(roi_sum=data['roi'], roi_count=data['roi'].notna(), cpa_sum=row_cpa.fillna(0),
+                          cpa_count=row_cpa.notna(), rows=1).groupby(['date', 'channel'], observed=True, sort=True)
+    return grouped[KPI_SUMS].sum()
+
+def update_kpi_table(kpis, new_data):
+    """
+    Fold newly appended rows into an existing KPI table without rescanning the older data.
+    Days that already exist in the table (late-arriving rows) are added to, not replaced.
+    """
+    new_kpis = kpi_table(new_data)
+    combined = pd.concat([kpis, new_kpis])
+    if combined.index.has_duplicates:
+        combined = combined.groupby(level=['date', 'channel'], observed=True, sort=True).sum()
+    else:
+        combined = combined.sort_index()
+    return combined
+
+def derive_kpis(kpis):
+    """
+    Add ratio KPIs to a table of KPI sums. CPA is left undefined (NaN) where there were no conversions.
+    """
+    derived = kpis.copy()
+    derived['avg_roi'] = derived['roi_sum'] / derived['roi_count'].where(derived['roi_count'] > 0)
+    derived['CPA'] = derived['spend'] / derived['conversions'].where(derived['conversions'] > 0)
+    return derived
+
+def summarize_kpis(kpis, by=None):
+    """
+    Roll the KPI table up to one row per `by` level ('date' or 'channel'), or to a single total row when by is None.
+    """
+    if by is None:
+        totals = kpis[KPI_SUMS].sum().to_frame().T
+    else:
+        totals = kpis[KPI_SUMS].groupby(level=by, observed=True).sum()
+    return derive_kpis(totals)
+
+def performance_analysis(data, kpis=None):
     """
     Generate visualizations for performance across marketing channels.
     """
     logger.info("Starting performance analysis...")
-    plt.figure(figsize=(12, 6))
-    sns.lineplot(data=data, x='date', y='spend', hue='channel')
-    plt.xlabel("Date")
-    plt.ylabel("Spend")
-    plt.title("Marketing Spend Over Time by Channel")
-    plt.savefig('marketing_spend_over_time.png')
-    plt.close()
+    if kpis is None:
+        kpis = kpi_table(data)
+    # Mean spend per row, the same value seaborn plotted from the raw rows
+    daily = kpis.reset_index().assign(spend=lambda k: k['spend'] / k['rows'])
+
+    # Standalone Figures instead of global pyplot state, so this stage is safe to run in a worker thread
+    fig = Figure(figsize=(12, 6))
+    ax = fig.subplots()
+    sns.lineplot(data=daily, x='date', y='spend', hue='channel', errorbar=None, ax=ax)
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Spend")
+    ax.set_title("Marketing Spend Over Time by Channel")
+    fig.savefig('marketing_spend_over_time.png')
     logger.info("Generated marketing spend visualization.")
 
-    plt.figure(figsize=(10, 5))
-    sns.barplot(data=data, x='channel', y='roi')
-    plt.xlabel("Channel")
-    plt.ylabel("ROI")
-    plt.title("ROI by Marketing Channel")
-    plt.savefig('roi_by_channel.png')
-    plt.close()
+    by_channel = summarize_kpis(kpis, by='channel').reset_index()
+    fig = Figure(figsize=(10, 5))
+    ax = fig.subplots()
+    sns.barplot(data=by_channel, x='channel', y='avg_roi', ax=ax)
+    ax.set_xlabel("Channel")
+    ax.set_ylabel("ROI")
+    ax.set_title("ROI by Marketing Channel")
+    fig.savefig('roi_by_channel.png')
     logger.info("Generated ROI by channel visualization.")
 
-def budget_prediction(data):
+BUDGET_FEATURES = ['spend', 'roi', 'month', 'channel']
+
+def budget_features(data):
+    """
+    Build the time-ordered feature matrix for budget prediction. Channel stays as its name;
+    the model pipeline encodes it against the channel list it was fitted with.
+    """
+    ordered = data.sort_values('date', kind='stable')
+    X = pd.DataFrame({
+        'spend': ordered['spend'].to_numpy(),
+        'roi': ordered['roi'].to_numpy(),
+        'month': ordered['date'].dt.month.to_numpy(),
+        'channel': ordered['channel'].astype(str).to_numpy()
+    })
+    return X, ordered['conversions'].reset_index(drop=True)
+
+def budget_model(channels):
+    """
+    Histogram gradient boosting with early stopping and channel as a native categorical feature.
+    Channel codes come from the fixed `channels` list saved inside the pipeline, so a reloaded model
+    encodes new data the same way; channels it has not seen are treated as missing.
+    """
+    encoder = ColumnTransformer(
+        [('channel', OrdinalEncoder(categories=[list(channels)], handle_unknown='use_encoded_value',
+                                    unknown_value=np.nan), ['channel'])],
+        remainder='passthrough')
+    regressor = HistGradientBoostingRegressor(max_iter=500, early_stopping=True, validation_fraction=0.1,
+                                              n_iter_no_change=10, categorical_features=[True, False, False, False],
+                                              random_state=42)
+    return Pipeline([('encode', encoder), ('regressor', regressor)])
+
+def budget_prediction(data, n_splits=5, model_path='budget_prediction_model.joblib'):
     """
     Predict future budget requirements using an advanced regression model.
+    Validated with TimeSeriesSplit so every fold trains on the past and tests on the future;
+    the final model is refit on all data and saved to model_path for reuse.
     """
     logger.info("Starting budget prediction modeling...")
-    data['month'] = data['date'].dt.month
-    X = data[['spend', 'roi', 'month']]
-    y = data['conversions']
-    
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-    
-    # Use Gradient Boosting for better accuracy in predictions
-    model = GradientBoostingRegressor(random_state=42)
-    model.fit(X_train, y_train)
-    y_pred = model.predict(X_test)
-    
-    mse = mean_squared_error(y_test, y_pred)
+    X, y = budget_features(data)
+    channels = sorted(X['channel'].unique())
+
+    fold_mse = []
+    for train_idx, test_idx in TimeSeriesSplit(n_splits=n_splits).split(X):
+        model = budget_model(channels).fit(X.iloc[train_idx], y.iloc[train_idx])
+        y_test, y_pred = y.iloc[test_idx], model.predict(X.iloc[test_idx])
+        fold_mse.append(mean_squared_error(y_test, y_pred))
+
+    # The last fold is the most recent hold-out period
+    mse = fold_mse[-1]
     r2 = r2_score(y_test, y_pred)
-    logger.info(f"Budget prediction model completed with MSE: {mse:.2f} and R2: {r2:.2f}")
-    
+    logger.info(f"Budget prediction model completed with MSE: {mse:.2f} and R2: {r2:.2f} "
+                f"(mean CV MSE over {n_splits} time-ordered folds: {np.mean(fold_mse):.2f})")
+
+    model = budget_model(channels).fit(X, y)
+    if model_path:
+        joblib.dump(model, model_path)
+        logger.info(f"Saved budget prediction model to {model_path}.")
+
     return model, y_test, y_pred
 
-def attribution_analysis(data):
+def load_budget_model(model_path='budget_prediction_model.joblib'):
+    """
+    Load a budget prediction model saved by budget_prediction. It predicts from budget_features(data)
+    directly, encoding channels with the list it was trained on.
+    """
+    return joblib.load(model_path)
+
+def benchmark_budget_prediction(data, test_size=0.2):
+    """
+    Compare the previous model (default GradientBoostingRegressor on spend, roi and month) with the
+    histogram model on the same chronological hold-out: fit time, MSE and R2.
+    """
+    X, y = budget_features(data)
+    split = int(len(X) * (1 - test_size))
+    candidates = {
+        'GradientBoostingRegressor': (GradientBoostingRegressor(random_state=42), ['spend', 'roi', 'month']),
+        'HistGradientBoostingRegressor': (budget_model(sorted(X['channel'].unique())), BUDGET_FEATURES)
+    }
+
+    results = []
+    for name, (model, features) in candidates.items():
+        start = time.perf_counter()
+        model.fit(X[features].iloc[:split], y.iloc[:split])
+        fit_seconds = time.perf_counter() - start
+        y_pred = model.predict(X[features].iloc[split:])
+        results.append({'model': name, 'fit_seconds': fit_seconds,
+                        'mse': mean_squared_error(y.iloc[split:], y_pred), 'r2': r2_score(y.iloc[split:], y_pred)})
+    results = pd.DataFrame(results)
+    logger.info(f"Budget prediction benchmark:\n{results}")
+    return results
+
+# User journeys in CSR layout: touches of journey j are channel_ids[offsets[j]:offsets[j + 1]]
+Journeys = namedtuple('Journeys', ['channel_ids', 'offsets', 'converted', 'channels'])
+
+def encode_journeys(touchpoints, user_col='user_id', time_col='date', channel_col='channel', conversion_col='converted'):
+    """
+    Encode a touchpoint log (one row per user touch) as integer channel-id journeys with CSR offsets.
+    A journey converts if any of its touches is flagged in conversion_col.
+    """
+    if touchpoints.empty:
+        raise ValueError("Cannot encode journeys from an empty touchpoint log.")
+    ordered = touchpoints.sort_values([user_col, time_col], kind='stable')
+    user_codes = pd.factorize(ordered[user_col])[0]
+    channel_ids, channels = pd.factorize(ordered[channel_col], sort=True)
+
+    starts = np.flatnonzero(np.r_[True, user_codes[1:] != user_codes[:-1]])
+    offsets = np.r_[starts, len(ordered)].astype(np.int64)
+    converted = np.maximum.reduceat(ordered[conversion_col].to_numpy().astype(np.int8), starts).astype(bool)
+    return Journeys(channel_ids.astype(np.int16), offsets, converted, [str(c) for c in channels])
+
+def _transition_matrix(journeys):
+    """
+    Count state transitions of all journeys at once and normalize them into a sparse probability matrix.
+    States: 0 = start, 1..C = channels, C + 1 = conversion, C + 2 = null.
+    """
+    num_channels = len(journeys.channels)
+    conversion, null, num_states = num_channels + 1, num_channels + 2, num_channels + 3
+    lengths = np.diff(journeys.offsets)
+    starts, ends = journeys.offsets[:-1][lengths > 0], journeys.offsets[1:][lengths > 0]
+
+    # Each touch is entered from the previous touch, or from start for the first touch of a journey
+    to_state = journeys.channel_ids.astype(np.int64) + 1
+    from_state = np.roll(to_state, 1)
+    from_state[starts] = 0
+
+    # Each journey leaves its last touch for conversion or null
+    final_from = to_state[ends - 1]
+    final_to = np.where(journeys.converted[lengths > 0], conversion, null)
+
+    rows = np.concatenate([from_state, final_from])
+    cols = np.concatenate([to_state, final_to])
+    counts = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(num_states, num_states))
+    out_degree = np.asarray(counts.sum(axis=1)).ravel()
+    scale = sparse.diags(np.divide(1.0, out_degree, out=np.zeros(num_states), where=out_degree > 0))
+    return (scale @ counts).tocsc(), num_channels
+
+def _conversion_probability(transitions, num_channels, removed=None):
+    """
+    Absorption probability into conversion from start, solving (I - Q) p = R over the transient states.
+    A removed channel has its incoming transitions redirected to null.
+    """
+    transient = num_channels + 1
+    Q = transitions[:transient, :transient]
+    R = transitions[:transient, num_channels + 1].toarray().ravel()
+    if removed is not None:
+        keep = np.ones(transient)
+        keep[removed + 1] = 0
+        Q = Q @ sparse.diags(keep)
+        R = R.copy()
+        R[removed + 1] = 0
+    p = spsolve((sparse.identity(transient, format='csc') - Q).tocsc(), R)
+    return p[0]
+
+def markov_attribution(journeys):
+    """
+    First-order Markov-chain attribution: each channel's share of conversions in proportion to its removal effect.
+    """
+    transitions, num_channels = _transition_matrix(journeys)
+    base = _conversion_probability(transitions, num_channels)
+    removal_effects = np.array([
+        1 - _conversion_probability(transitions, num_channels, removed=c) / base if base > 0 else 0.0
+        for c in range(num_channels)
+    ])
+    total = removal_effects.sum()
+    shares = removal_effects / total if total > 0 else removal_effects
+    return pd.DataFrame({'channel': journeys.channels, 'removal_effect': removal_effects,
+                         'attribution': shares, 'attributed_conversions': shares * journeys.converted.sum()})
+
+def shapley_attribution(journeys):
+    """
+    Shapley-value attribution over channel coalitions.
+    v(S) is the number of converted journeys whose channel set lies within S; every coalition value
+    is computed once into a 2^C array indexed by bitmask (subset-sum transform), then reused.
+    """
+    num_channels = len(journeys.channels)
+    if num_channels > 20:
+        raise ValueError("Shapley attribution over bitmasks supports at most 20 channels.")
+    lengths = np.diff(journeys.offsets)
+    nonempty = lengths > 0
+
+    # Channel-set bitmask of every journey
+    touch_masks = np.left_shift(np.int64(1), journeys.channel_ids.astype(np.int64))
+    journey_masks = np.bitwise_or.reduceat(touch_masks, journeys.offsets[:-1][nonempty])
+    value = np.bincount(journey_masks, weights=journeys.converted[nonempty], minlength=1 << num_channels)
+
+    # Subset-sum (zeta) transform: value[S] = sum of conversions over all channel sets contained in S
+    for bit in range(num_channels):
+        with_bit = (np.arange(1 << num_channels) >> bit) & 1 == 1
+        value[with_bit] += value[np.flatnonzero(with_bit) ^ (1 << bit)]
+
+    masks = np.arange(1 << num_channels)
+    sizes = np.array([bin(m).count('1') for m in range(1 << num_channels)])
+    weights = np.array([factorial(k) * factorial(num_channels - k - 1) / factorial(num_channels)
+                        for k in range(num_channels)])
+    shapley = np.empty(num_channels)
+    for c in range(num_channels):
+        without = masks[(masks >> c) & 1 == 0]
+        shapley[c] = np.sum(weights[sizes[without]] * (value[without | (1 << c)] - value[without]))
+
+    total = shapley.sum()
+    return pd.DataFrame({'channel': journeys.channels, 'shapley_value': shapley,
+                         'attribution': shapley / total if total > 0 else shapley})
+
+def attribution_analysis(data, journeys=None):
     """
     Perform multi-touch attribution modeling to assign credit to each channel.
+    With user journeys (a Journeys tuple, or a user_id/converted touchpoint log in data), credit is
+    assigned with Markov-chain removal effects and Shapley values; otherwise each channel's share
+    of summed conversions is reported.
     """
     logger.info("Starting attribution analysis...")
-    attribution = data.groupby('channel')['conversions'].sum() / data['conversions'].sum()
-    attribution_df = attribution.reset_index()
-    attribution_df.columns = ['channel', 'attribution']
+    if journeys is None and {'user_id', 'converted'}.issubset(data.columns):
+        journeys = encode_journeys(data)
+
+    if journeys is not None:
+        markov = markov_attribution(journeys)
+        shapley = shapley_attribution(journeys)
+        attribution_df = markov[['channel', 'attribution']].rename(columns={'attribution': 'markov_attribution'})
+        attribution_df['shapley_attribution'] = shapley['attribution'].to_numpy()
+        attribution_df['attribution'] = attribution_df['markov_attribution']
+    else:
+        attribution = data.groupby('channel', observed=True)['conversions'].sum() / data['conversions'].sum()
+        attribution_df = attribution.reset_index()
+        attribution_df.columns = ['channel', 'attribution']
     
     # Save attribution results to CSV for reporting
     attribution_df.to_csv('channel_attribution.csv', index=False)
     logger.info("Attribution analysis completed and saved as channel_attribution.csv.")
     return attribution_df
 
+def simulate_journeys(num_journeys, num_channels=6, seed=42):
+    """
+    Generate synthetic CSR journeys (geometric path lengths, channel-dependent conversion) for benchmarking.
+    """
+    rng = np.random.default_rng(seed)
+    lengths = np.minimum(rng.geometric(0.4, num_journeys), 20)
+    offsets = np.r_[0, np.cumsum(lengths)].astype(np.int64)
+    channel_ids = rng.integers(0, num_channels, offsets[-1]).astype(np.int16)
+    lift = np.linspace(0.01, 0.06, num_channels)
+    touch_lift = np.add.reduceat(lift[channel_ids], offsets[:-1])
+    converted = rng.random(num_journeys) < np.minimum(touch_lift, 0.9)
+    return Journeys(channel_ids, offsets, converted, [f'channel_{c}' for c in range(num_channels)])
+
+def benchmark_attribution(sizes=(1_000_000, 10_000_000), num_channels=6):
+    """
+    Time Markov and Shapley attribution on synthetic journeys of the given sizes.
+    """
+    results = []
+    for size in sizes:
+        journeys = simulate_journeys(size, num_channels)
+        start = time.perf_counter()
+        markov_attribution(journeys)
+        markov_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        shapley_attribution(journeys)
+        shapley_seconds = time.perf_counter() - start
+        results.append({'journeys': size, 'touches': len(journeys.channel_ids),
+                        'markov_seconds': markov_seconds, 'shapley_seconds': shapley_seconds})
+    results = pd.DataFrame(results)
+    logger.info(f"Attribution benchmark:\n{results}")
+    return results
+
 def incrementality_analysis(data):
     """
     Perform A/B testing to analyze the incrementality of marketing channels.
@@ -121,15 +610,18 @@ def incrementality_analysis(data):
     
     return {'t_stat': t_stat, 'p_value': p_value}
 
-def profitability_metrics(data):
+def profitability_metrics(data, kpis=None):
     """
     Calculate key profitability metrics including CPA, LTV, and overall profitability.
+    Average CPA is the mean of spend / conversions over rows with conversions; the input frame is not modified.
     """
     logger.info("Calculating profitability metrics...")
-    data['CPA'] = data['spend'] / data['conversions']
-    avg_cpa = data['CPA'].mean()
-    total_ltv = data['conversions'].sum() * 100  # Assume an average LTV of $100 for demonstration
-    total_spend = data['spend'].sum()
+    if kpis is None:
+        kpis = kpi_table(data)
+    totals = summarize_kpis(kpis).iloc[0]
+    avg_cpa = totals['cpa_sum'] / totals['cpa_count'] if totals['cpa_count'] else np.nan
+    total_ltv = totals['conversions'] * 100  # Assume an average LTV of $100 for demonstration
+    total_spend = totals['spend']
     profitability = total_ltv - total_spend
     
     profitability_metrics = {
@@ -140,38 +632,203 @@ def profitability_metrics(data):
     logger.info(f"Profitability metrics calculated: {profitability_metrics}")
     return profitability_metrics
 
-def generate_dashboard(data):
+def generate_dashboard(data, kpis=None):
     """
     Generate key metrics and visualizations for dashboard export.
     """
     logger.info("Generating Google Data Studio-compatible reports...")
-    total_spend = data['spend'].sum()
-    total_conversions = data['conversions'].sum()
-    avg_roi = data['roi'].mean()
+    if kpis is None:
+        kpis = kpi_table(data)
+    totals = summarize_kpis(kpis).iloc[0]
     
     metrics_summary = pd.DataFrame({
         'Metric': ['Total Spend', 'Total Conversions', 'Average ROI'],
-        'Value': [total_spend, total_conversions, avg_roi]
+        'Value': [totals['spend'], totals['conversions'], totals['avg_roi']]
     })
     metrics_summary.to_csv('metrics_summary.csv', index=False)
+    derive_kpis(kpis).reset_index().to_csv('daily_channel_kpis.csv', index=False)
     logger.info("Generated summary metrics for dashboard export.")
 
-def main():
+# Analysis stages after preprocessing: name -> (function, executor, takes the KPI table).
+# Model fitting is CPU-bound and runs in a process; plotting and CSV/report stages run in threads.
+STAGES = {
+    'performance_analysis': (performance_analysis, 'thread', True),
+    'budget_prediction': (budget_prediction, 'process', False),
+    'attribution_analysis': (attribution_analysis, 'thread', False),
+    'incrementality_analysis': (incrementality_analysis, 'thread', False),
+    'profitability_metrics': (profitability_metrics, 'thread', True),
+    'generate_dashboard': (generate_dashboard, 'thread', True),
+}
+
+# Read-only inputs of the current run. Forked worker processes inherit them copy-on-write;
+# elsewhere workers load them from a Parquet spill written once per run.
+_shared_inputs = {}
+
+def _share_inputs(data, kpis):
+    _shared_inputs['data'], _shared_inputs['kpis'] = data, kpis
+
+def _load_shared_inputs(spill_dir):
+    _share_inputs(pd.read_parquet(os.path.join(spill_dir, 'data.parquet'), memory_map=True),
+                  pd.read_parquet(os.path.join(spill_dir, 'kpis.parquet'), memory_map=True))
+
+def _max_rss_mb(who):
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1024 ** 2 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(who).ru_maxrss / scale
+
+def _run_stage(name, run_start, trace_memory, executor):
+    """
+    Run one stage on the shared inputs and return (result, profile); executor records where it ran.
+    Memory is traced with tracemalloc only when trace_memory is set, since tracing slows stages down;
+    max_rss_mb is always recorded for the process the stage ran in.
+    """
+    func, _, uses_kpis = STAGES[name]
+    data, kpis = _shared_inputs['data'], _shared_inputs['kpis']
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    if trace_memory:
+        tracemalloc.reset_peak()
+    start, cpu_start = time.time(), time.thread_time()
+    try:
+        result = func(data, kpis) if uses_kpis else func(data)
+    finally:
+        profile = {
+            'stage': name,
+            'executor': executor,
+            'start_offset_seconds': start - run_start,
+            'wall_seconds': time.time() - start,
+            'cpu_seconds': time.thread_time() - cpu_start,
+            'peak_traced_mb': tracemalloc.get_traced_memory()[1] / 1024 ** 2 if trace_memory else None,
+            'max_rss_mb': _max_rss_mb(resource.RUSAGE_SELF) if resource else None,
+            'pid': os.getpid(),
+        }
+        if started_tracing:
+            tracemalloc.stop()
+    return result, profile
+
+@contextmanager
+def log_stage(name, profiles, run_start, profile_memory=False):
+    """
+    Time a sequential step of main() (loading, preprocessing) and append its profile entry.
+    """
+    if profile_memory:
+        tracemalloc.start()
+    start, cpu_start = time.time(), time.thread_time()
+    try:
+        yield
+    finally:
+        profiles.append({
+            'stage': name,
+            'executor': 'main',
+            'start_offset_seconds': start - run_start,
+            'wall_seconds': time.time() - start,
+            'cpu_seconds': time.thread_time() - cpu_start,
+            'peak_traced_mb': tracemalloc.get_traced_memory()[1] / 1024 ** 2 if profile_memory else None,
+            'max_rss_mb': _max_rss_mb(resource.RUSAGE_SELF) if resource else None,
+            'pid': os.getpid(),
+        })
+        if profile_memory:
+            tracemalloc.stop()
+        logger.info(f"{name} took {profiles[-1]['wall_seconds']:.2f}s.")
+
+def run_stages(data, kpis, parallel=False, max_workers=4, run_start=None, profile_memory=False):
+    """
+    Run the analysis stages on one read-only copy of the preprocessed data and return
+    (results, stage profiles, whether the stages actually ran in parallel). In parallel mode the thread stages share the frame in-process while budget_prediction fits in a worker
+    process. With profile_memory, stages are traced with tracemalloc (sequential mode, and process stages in
+    parallel mode, where memory can be attributed to one stage); timings are then inflated by the tracing.
+    """
+    _share_inputs(data, kpis)
+    run_start = time.time() if run_start is None else run_start
+    results, profiles = {}, []
+    available_cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+    if parallel and available_cpus < 2:
+        logger.info("Only one CPU is available; running the analysis stages sequentially.")
+        parallel = False
+    if not parallel:
+        for name in STAGES:
+            results[name], profile = _run_stage(name, run_start, profile_memory, 'main')
+            profiles.append(profile)
+        return results, profiles, False
+
+    process_stages = [name for name, (_, executor, _) in STAGES.items() if executor == 'process']
+    thread_stages = [name for name in STAGES if name not in process_stages]
+    spill_dir = None
+    if 'fork' in multiprocessing.get_all_start_methods():
+        # Forked workers inherit _shared_inputs, so the frame's buffers are shared rather than pickled
+        pool_options = {'mp_context': multiprocessing.get_context('fork')}
+    else:
+        spill_dir = tempfile.mkdtemp(prefix='marketing_stages_')
+        data.to_parquet(os.path.join(spill_dir, 'data.parquet'))
+        kpis.to_parquet(os.path.join(spill_dir, 'kpis.parquet'))
+        pool_options = {'initializer': _load_shared_inputs, 'initargs': (spill_dir,)}
+    try:
+        with ProcessPoolExecutor(max_workers=max(1, len(process_stages)), **pool_options) as processes, \
+                ThreadPoolExecutor(max_workers=max_workers) as threads:
+            # Process stages are submitted first (and so forked before any worker thread starts); they are the slowest
+            futures = {name: processes.submit(_run_stage, name, run_start, profile_memory, 'process') for name in process_stages}
+            futures.update({name: threads.submit(_run_stage, name, run_start, False, 'thread') for name in thread_stages})
+            for name in STAGES:
+                results[name], profile = futures[name].result()
+                profiles.append(profile)
+    finally:
+        if spill_dir is not None:
+            shutil.rmtree(spill_dir, ignore_errors=True)
+    return results, profiles, True
+
+def write_run_profile(profiles, run_seconds, parallel, profile_path='run_profile.json'):
+    """
+    Write per-stage timings and memory, plus run totals and peak RSS, to a JSON file.
+    """
+    report = {
+        'mode': 'parallel' if parallel else 'sequential',
+        'wall_seconds': run_seconds,
+        'sum_of_stage_seconds': sum(p['wall_seconds'] for p in profiles),
+        'slowest_stage_seconds': max((p['wall_seconds'] for p in profiles), default=0.0),
+        'max_rss_mb': _max_rss_mb(resource.RUSAGE_SELF) if resource else None,
+        'max_child_rss_mb': _max_rss_mb(resource.RUSAGE_CHILDREN) if resource else None,
+        'stages': profiles,
+    }
+    with open(profile_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Wrote run profile to {profile_path} ({report['mode']}: {run_seconds:.2f}s wall, "
+                f"{report['sum_of_stage_seconds']:.2f}s summed over stages).")
+    return report
+
+def main(parallel=False, profile_path='run_profile.json', profile_memory=False):
+    run_start = time.time()
     sql_connection_string = 'sqlite:///marketing_analytics.db'
-    data = load_performance_data(sql_connection_string)
-    data = preprocess_data(data)
-    performance_analysis(data)
-    model, y_test, y_pred = budget_prediction(data)
-    attribution_df = attribution_analysis(data)
-    incrementality_results = incrementality_analysis(data)
-    profitability_metrics_results = profitability_metrics(data)
+    profiles = []
+    with log_stage('load_data', profiles, run_start, profile_memory):
+        data = cached_performance_data(sql_connection_string)
+    with log_stage('preprocess_data', profiles, run_start, profile_memory):
+        data = preprocess_data(data)
+        kpis = kpi_table(data)
+
+    results, stage_profiles, ran_parallel = run_stages(data, kpis, parallel=parallel, run_start=run_start,
+                                                       profile_memory=profile_memory)
+    profiles.extend(stage_profiles)
+    incrementality_results = results['incrementality_analysis']
+    profitability_metrics_results = results['profitability_metrics']
     
     print(f"Incrementality Test Results: T-Statistic = {incrementality_results['t_stat']}, P-Value = {incrementality_results['p_value']}")
     print(f"Profitability Metrics: {profitability_metrics_results}")
     
-    generate_dashboard(data)
+    write_run_profile(profiles, time.time() - run_start, ran_parallel, profile_path)
     logger.info("Advanced Marketing Analytics and Budget Prediction Suite completed successfully.")
 
 if __name__ == "__main__":
-    main()
+    if "--invalidate-cache" in sys.argv:
+        # Optional month arguments, e.g. --invalidate-cache 2024-01 2024-02
+        months = sys.argv[sys.argv.index("--invalidate-cache") + 1:]
+        invalidate_cache(months=months or None)
+    elif "--check-streaming" in sys.argv:
+        check_streaming_reads()
+    elif "--benchmark-attribution" in sys.argv:
+        benchmark_attribution()
+    else:
+        main(parallel="--parallel" in sys.argv, profile_memory="--profile-memory" in sys.argv)
 
@@ -12,6 +12,142 @@ from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split
 from prophet import Prophet
 from sklearn.metrics import mean_squared_error
+import sys
+import time
+
+# ---- Pricing engine: fused price kernel and scenario-batch evaluation ----
+PRICE_COLUMNS = ['Sentiment_Adjusted_Price', 'Supply_Demand_Adjusted_Price', 'Risk_Adjusted_Price', 'Final_Price']
+
+def price_kernel(base, sentiment, demand, supply, risk, out=None):
+    """
+    Compute the sentiment, supply-demand, risk-adjusted and final prices in one pass into a preallocated
+    (4, N) array. Rows with Supply == 0 get NaN supply-demand and final prices instead of inf.
+    """
+    if out is None:
+        out = np.empty((4, len(base)), dtype=np.float64)
+    sentiment_price, supply_demand_price, risk_price, final_price = out
+
+    np.add(sentiment, 1, out=sentiment_price)
+    np.multiply(sentiment_price, base, out=sentiment_price)
+
+    supply_demand_price.fill(np.nan)
+    np.divide(demand, supply, out=supply_demand_price, where=supply != 0)
+    np.multiply(supply_demand_price, base, out=supply_demand_price)
+
+    np.add(risk, 1, out=risk_price)
+    np.multiply(risk_price, base, out=risk_price)
+
+    np.add(sentiment_price, supply_demand_price, out=final_price)
+    np.add(final_price, risk_price, out=final_price)
+    np.divide(final_price, 3, out=final_price)
+    return out
+
+def price_book(df):
+    """
+    Add the four price columns to the pricing book with the fused kernel.
+    """
+    prices = price_kernel(*(df[col].to_numpy(dtype=np.float64)
+                            for col in ['Base_Price', 'Sentiment_Score', 'Demand', 'Supply', 'Risk_Factor']))
+    for col, values in zip(PRICE_COLUMNS, prices):
+        df[col] = values
+    zero_supply = int((df['Supply'] == 0).sum())
+    if zero_supply:
+        print(f"Warning: {zero_supply} rows have Supply == 0; their supply-demand and final prices are left undefined (NaN).")
+    return df
+
+def make_scenario_grid(sentiment_shifts=(0.0,), supply_shocks=(1.0,), risk_shifts=(0.0,), demand_shocks=(1.0,)):
+    """
+    Build every combination of what-if shocks: additive shifts to Sentiment_Score and Risk_Factor and
+    multiplicative shocks to Supply and Demand.
+    """
+    grid = np.meshgrid(sentiment_shifts, supply_shocks, risk_shifts, demand_shocks, indexing='ij')
+    return pd.DataFrame({name: values.ravel() for name, values in
+                         zip(['sentiment_shift', 'supply_shock', 'risk_shift', 'demand_shock'], grid)})
+
+def evaluate_scenarios(df, scenarios, chunk_size=None, out=None):
+    """
+    Evaluate the final price of every book row under every scenario (an S x N matrix) in float32 chunks of
+    scenarios, reusing one buffer per chunk. Returns the mean final price per scenario; pass an (S, N)
+    float32 array (e.g. np.memmap) as out to keep the full matrix. Rows with Supply == 0 are NaN in out and
+    excluded from the means.
+
+    Final price = Base / 3 * (2 + Sentiment + Risk + Demand / Supply), so each scenario only rescales the
+    demand/supply ratio and shifts the constant term.
+    """
+    if (scenarios['supply_shock'] <= 0).any():
+        raise ValueError("Supply shocks must be positive multipliers.")
+    supply = df['Supply'].to_numpy(dtype=np.float64)
+    valid = supply != 0
+    all_valid = valid.all()
+    base_third = (df['Base_Price'].to_numpy(dtype=np.float64)[valid] / 3).astype(np.float32)
+    constant = (2 + df['Sentiment_Score'].to_numpy(dtype=np.float64)[valid]
+                + df['Risk_Factor'].to_numpy(dtype=np.float64)[valid]).astype(np.float32)
+    ratio = (df['Demand'].to_numpy(dtype=np.float64)[valid] / supply[valid]).astype(np.float32)
+
+    shifts = (scenarios['sentiment_shift'] + scenarios['risk_shift']).to_numpy(dtype=np.float32)
+    ratio_shocks = (scenarios['demand_shock'] / scenarios['supply_shock']).to_numpy(dtype=np.float32)
+    num_scenarios, num_rows = len(scenarios), len(ratio)
+    if chunk_size is None:
+        # Keep each chunk buffer around 64 MB
+        chunk_size = max(1, min(num_scenarios, (16 * 1024 ** 2) // max(num_rows, 1)))
+
+    if out is not None and not all_valid:
+        out[:, ~valid] = np.nan
+    buffer = np.empty((chunk_size, num_rows), dtype=np.float32)
+    means = np.empty(num_scenarios, dtype=np.float64)
+    for start in range(0, num_scenarios, chunk_size):
+        stop = min(start + chunk_size, num_scenarios)
+        # Write straight into the caller's matrix when there are no columns to skip
+        chunk = out[start:stop] if out is not None and all_valid else buffer[:stop - start]
+        np.multiply(ratio_shocks[start:stop, None], ratio, out=chunk)
+        np.add(chunk, constant, out=chunk)
+        np.add(chunk, shifts[start:stop, None], out=chunk)
+        np.multiply(chunk, base_third, out=chunk)
+        means[start:stop] = chunk.sum(axis=1, dtype=np.float64) / max(num_rows, 1)
+        if out is not None and not all_valid:
+            out[start:stop, valid] = chunk
+    return pd.Series(means, index=scenarios.index, name='Mean_Final_Price')
+
+def benchmark_pricing_engine(num_rows=1_000_000, num_scenarios=2_000, seed=42):
+    """
+    Report price evaluations per second for the step 2 kernel and for scenario-batch evaluation on a synthetic book.
+    """
+    rng = np.random.default_rng(seed)
+    book = pd.DataFrame({
+        'Base_Price': rng.uniform(50, 150, num_rows),
+        'Sentiment_Score': rng.uniform(-1, 1, num_rows),
+        'Supply': rng.integers(0, 1000, num_rows).astype(float),
+        'Demand': rng.uniform(100, 1000, num_rows),
+        'Risk_Factor': rng.uniform(0, 0.5, num_rows),
+    })
+
+    start = time.perf_counter()
+    book["Sentiment_Adjusted_Price"] = book["Base_Price"] * (1 + book["Sentiment_Score"])
+    book["Supply_Demand_Adjusted_Price"] = book["Base_Price"] * (book["Demand"] / book["Supply"])
+    book["Risk_Adjusted_Price"] = book["Base_Price"] * (1 + book["Risk_Factor"])
+    book["Final_Price"] = (book["Sentiment_Adjusted_Price"] + book["Supply_Demand_Adjusted_Price"] + book["Risk_Adjusted_Price"]) / 3
+    pandas_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    price_kernel(*(book[col].to_numpy() for col in ['Base_Price', 'Sentiment_Score', 'Demand', 'Supply', 'Risk_Factor']))
+    kernel_seconds = time.perf_counter() - start
+
+    side = int(np.ceil(num_scenarios ** (1 / 3)))
+    scenarios = make_scenario_grid(np.linspace(-0.2, 0.2, side), np.linspace(0.5, 1.5, side),
+                                   np.linspace(0, 0.3, side)).iloc[:num_scenarios]
+    start = time.perf_counter()
+    evaluate_scenarios(book, scenarios)
+    scenario_seconds = time.perf_counter() - start
+
+    print(f"---- Pricing engine benchmark ({num_rows:,} rows) ----")
+    print(f"Step 2 pandas columns: {num_rows / pandas_seconds:,.0f} price evaluations/s")
+    print(f"Fused kernel (float64): {num_rows / kernel_seconds:,.0f} price evaluations/s")
+    print(f"Scenario batch (float32, {len(scenarios):,} scenarios): "
+          f"{len(scenarios) * num_rows / scenario_seconds:,.0f} price evaluations/s")
+
+if "--benchmark-pricing" in sys.argv:
+    benchmark_pricing_engine()
+    sys.exit(0)
 
 # ---- Step 1: Read the dataset 'pricing_modeling_data.csv' ----
 df = pd.read_csv("pricing_modeling_data.csv")
@@ -20,22 +156,16 @@ df = pd.read_csv("pricing_modeling_data.csv")
 df['Date'] = pd.to_datetime(df['Date'])
 
 # ---- Step 2: Price Adjustments based on Sentiment, Supply-Demand, Risk ----
-# Sentiment-Adjusted Price (SAPF)
-df["Sentiment_Adjusted_Price"] = df["Base_Price"] * (1 + df["Sentiment_Score"])
-
-# Supply-Demand Elasticity Adjusted Price (FSDEM)
-df["Supply_Demand_Adjusted_Price"] = df["Base_Price"] * (df["Demand"] / df["Supply"])
-
-# Risk-Adjusted Price (RAPSA)
-df["Risk_Adjusted_Price"] = df["Base_Price"] * (1 + df["Risk_Factor"])
-
-# Final Price: Combine all effects (Sentiment, Supply-Demand, Risk)
-df["Final_Price"] = (df["Sentiment_Adjusted_Price"] + df["Supply_Demand_Adjusted_Price"] + df["Risk_Adjusted_Price"]) / 3
+# Sentiment-Adjusted Price (SAPF), Supply-Demand Elasticity Adjusted Price (FSDEM), Risk-Adjusted Price (RAPSA)
+# and the Final Price combining all three are computed together by the fused pricing kernel
+df = price_book(df)
 
 # ---- Step 3: Random Forest Regression for Multi-Variable Prediction ----
 # Prepare the features (X) and target (y)
-X = df[['Supply', 'Demand', 'Sentiment_Score', 'Risk_Factor']]
-y = df['Final_Price']
+# Rows without a defined final price (Supply == 0) are left out of training
+priced = df[df['Final_Price'].notna()]
+X = priced[['Supply', 'Demand', 'Sentiment_Score', 'Risk_Factor']]
+y = priced['Final_Price']
 
 # Split the data into training and testing sets
 X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)